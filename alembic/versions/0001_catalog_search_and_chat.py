@@ -0,0 +1,347 @@
+"""Búsqueda del catálogo, ETags, dashboard y resumen/lectura/búsqueda del chat
+
+Columnas, tablas e índices agregados durante el backlog de rendimiento, con
+sus rellenos de datos. Cada paso comprueba el esquema antes de actuar: sirve
+tanto para bases creadas con el `create_all` antiguo como para una base nueva
+(`create_all` de init_db crea luego lo que falte).
+
+Se ejecuta una sola vez por despliegue (`alembic upgrade head`), nunca desde
+el arranque de cada worker.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Tablas ligeras (solo las columnas que tocan los rellenos)
+residences = sa.table(
+    "residences",
+    sa.column("id", sa.Integer),
+    sa.column("city", sa.String),
+    sa.column("district", sa.String),
+    sa.column("latitude", sa.Float),
+    sa.column("longitude", sa.Float),
+    sa.column("city_search", sa.String),
+    sa.column("district_search", sa.String),
+    sa.column("geohash", sa.String),
+)
+conversations = sa.table(
+    "conversations",
+    sa.column("id", sa.Integer),
+    sa.column("owner_id", sa.Integer),
+    sa.column("student_id", sa.Integer),
+    sa.column("created_at", sa.DateTime),
+    sa.column("last_message", sa.Text),
+    sa.column("last_message_at", sa.DateTime),
+    sa.column("last_sender_id", sa.Integer),
+    sa.column("owner_unread_count", sa.Integer),
+    sa.column("student_unread_count", sa.Integer),
+)
+messages = sa.table(
+    "messages",
+    sa.column("id", sa.Integer),
+    sa.column("conversation_id", sa.Integer),
+    sa.column("sender_id", sa.Integer),
+    sa.column("content", sa.Text),
+    sa.column("created_at", sa.DateTime),
+)
+message_tokens = sa.table(
+    "message_tokens",
+    sa.column("message_id", sa.Integer),
+    sa.column("token", sa.String),
+    sa.column("conversation_id", sa.Integer),
+)
+
+NEW_COLUMNS = {
+    "residences": [
+        sa.Column("city_search", sa.String(100)),
+        sa.Column("district_search", sa.String(100)),
+        sa.Column("geohash", sa.String(12)),
+    ],
+    "conversations": [
+        sa.Column("last_message", sa.Text, nullable=True),
+        sa.Column("last_message_at", sa.DateTime, nullable=True),
+        sa.Column("last_sender_id", sa.Integer, nullable=True),
+        sa.Column("owner_last_read_message_id", sa.Integer, nullable=True),
+        sa.Column("student_last_read_message_id", sa.Integer, nullable=True),
+        sa.Column("owner_unread_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("student_unread_count", sa.Integer, nullable=False, server_default="0"),
+    ],
+}
+
+# (nombre, tabla, tabla referida, columnas, columnas referidas) de las
+# columnas nuevas; SQLite no admite agregar FKs con ALTER y se omiten
+NEW_FOREIGN_KEYS = [
+    ("fk_conversations_last_sender_id", "conversations", "users", ["last_sender_id"], ["id"]),
+]
+
+# (tabla, nombre, columnas, kwargs)
+NEW_INDEXES = [
+    ("residences", "ix_residences_owner_id", ["owner_id"], {}),
+    ("residences", "ix_residences_city_search", ["city_search"], {"postgresql_ops": {"city_search": "varchar_pattern_ops"}}),
+    ("residences", "ix_residences_district_search", ["district_search"], {"postgresql_ops": {"district_search": "varchar_pattern_ops"}}),
+    ("residences", "ix_residences_geohash", ["geohash"], {"postgresql_ops": {"geohash": "varchar_pattern_ops"}}),
+    ("rooms", "ix_rooms_residence_id", ["residence_id"], {}),
+    ("reservations", "ix_reservations_room_status_dates", ["room_id", "status", "start_date", "end_date"], {}),
+    ("reservations", "ix_reservations_status_end_date", ["status", "end_date"], {}),
+    ("reservations", "ix_reservations_student_id_id", ["student_id", "id"], {}),
+    ("reservations", "ix_reservations_start_date", ["start_date"], {}),
+    ("reservations", "ix_reservations_end_date", ["end_date"], {}),
+    ("conversations", "uq_conversations_owner_student", ["owner_id", "student_id"], {"unique": True}),
+    ("conversations", "ix_conversations_owner_last_message", ["owner_id", "last_message_at", "id"], {}),
+    ("conversations", "ix_conversations_student_last_message", ["student_id", "last_message_at", "id"], {}),
+    ("conversations", "ix_conversations_last_message", ["last_message_at", "id"], {}),
+    ("messages", "ix_messages_conversation_id_id", ["conversation_id", "id"], {}),
+    (
+        "message_tokens",
+        "ix_message_tokens_token_conversation",
+        ["token", "conversation_id", "message_id"],
+        {"postgresql_ops": {"token": "varchar_pattern_ops"}},
+    ),
+]
+
+
+def _create_tables(inspector):
+    if not inspector.has_table("catalog_versions"):
+        op.create_table(
+            "catalog_versions",
+            sa.Column("table_name", sa.String(50), primary_key=True),
+            sa.Column("version", sa.Integer, nullable=False),
+        )
+    if not inspector.has_table("owner_stats"):
+        op.create_table(
+            "owner_stats",
+            sa.Column("owner_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("pending", sa.Integer, nullable=False),
+            sa.Column("confirmed", sa.Integer, nullable=False),
+            sa.Column("cancelled", sa.Integer, nullable=False),
+            sa.Column("rejected", sa.Integer, nullable=False),
+            sa.Column("completed", sa.Integer, nullable=False),
+            sa.Column("rooms_total", sa.Integer, nullable=False),
+            sa.Column("rooms_available", sa.Integer, nullable=False),
+            sa.Column("expected_monthly_revenue", sa.Float, nullable=False),
+            sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+        )
+    if not inspector.has_table("message_tokens") and inspector.has_table("messages"):
+        op.create_table(
+            "message_tokens",
+            sa.Column("message_id", sa.Integer, sa.ForeignKey("messages.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("token", sa.String(64), primary_key=True),
+            sa.Column("conversation_id", sa.Integer, nullable=False),
+        )
+
+
+def _add_columns(inspector, dialect: str):
+    for table, columns in NEW_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table, column)
+
+    if dialect == "sqlite":
+        return
+    for name, table, referent, local_cols, remote_cols in NEW_FOREIGN_KEYS:
+        if not inspector.has_table(table):
+            continue
+        if name not in {fk["name"] for fk in inspector.get_foreign_keys(table)}:
+            op.create_foreign_key(name, table, referent, local_cols, remote_cols)
+
+
+def _create_indexes(inspector):
+    for table, name, columns, kwargs in NEW_INDEXES:
+        if not inspector.has_table(table):
+            continue
+        if name in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+        op.create_index(name, table, columns, **kwargs)
+
+
+def _merge_duplicate_conversations(bind):
+    """
+    Une las conversaciones repetidas para un mismo (owner_id, student_id)
+    en la más antigua, antes de crear el índice único. Los mensajes se
+    mueven, los no leídos se suman y el resumen se recalcula después
+    (_backfill_conversation_summaries).
+    """
+    c = conversations.c
+    duplicated = bind.execute(
+        sa.select(c.owner_id, c.student_id, sa.func.min(c.id).label("keep_id"))
+        .group_by(c.owner_id, c.student_id)
+        .having(sa.func.count(c.id) > 1)
+    ).all()
+    for owner_id, student_id, keep_id in duplicated:
+        same_pair = (c.owner_id == owner_id) & (c.student_id == student_id)
+        extra_ids = list(bind.execute(sa.select(c.id).where(same_pair, c.id != keep_id)).scalars())
+        owner_unread, student_unread = bind.execute(
+            sa.select(sa.func.sum(c.owner_unread_count), sa.func.sum(c.student_unread_count)).where(same_pair)
+        ).one()
+
+        bind.execute(
+            sa.update(messages).where(messages.c.conversation_id.in_(extra_ids)).values(conversation_id=keep_id)
+        )
+        bind.execute(
+            sa.update(message_tokens)
+            .where(message_tokens.c.conversation_id.in_(extra_ids))
+            .values(conversation_id=keep_id)
+        )
+        bind.execute(sa.delete(conversations).where(c.id.in_(extra_ids)))
+        bind.execute(
+            sa.update(conversations)
+            .where(c.id == keep_id)
+            .values(
+                last_message=None,
+                last_message_at=None,
+                last_sender_id=None,
+                owner_unread_count=owner_unread or 0,
+                student_unread_count=student_unread or 0,
+            )
+        )
+
+
+def _backfill_residence_search(bind):
+    """Rellena city_search/district_search en residencias creadas antes de existir."""
+    from app.core.text import fold_text
+
+    c = residences.c
+    rows = bind.execute(
+        sa.select(c.id, c.city, c.district).where(
+            ((c.city.is_not(None)) & (c.city_search.is_(None)))
+            | ((c.district.is_not(None)) & (c.district_search.is_(None)))
+        )
+    ).all()
+    for row in rows:
+        bind.execute(
+            sa.update(residences)
+            .where(c.id == row.id)
+            .values(city_search=fold_text(row.city), district_search=fold_text(row.district))
+        )
+
+
+def _backfill_residence_geohash(bind):
+    """Calcula el geohash de residencias con coordenadas creadas antes de existir."""
+    from app.core.geo import geohash_encode
+
+    c = residences.c
+    rows = bind.execute(
+        sa.select(c.id, c.latitude, c.longitude).where(
+            c.latitude.is_not(None), c.longitude.is_not(None), c.geohash.is_(None)
+        )
+    ).all()
+    for row in rows:
+        bind.execute(
+            sa.update(residences)
+            .where(c.id == row.id)
+            .values(geohash=geohash_encode(row.latitude, row.longitude))
+        )
+
+
+def _backfill_conversation_summaries(bind):
+    """Copia el último mensaje a las conversaciones creadas antes de existir el resumen."""
+    c = conversations.c
+    m = messages.c
+
+    pending = sa.select(c.id).where(c.last_message_at.is_(None))
+    last_ids = (
+        sa.select(sa.func.max(m.id))
+        .where(m.conversation_id.in_(pending))
+        .group_by(m.conversation_id)
+    )
+    rows = bind.execute(
+        sa.select(m.conversation_id, m.content, m.created_at, m.sender_id).where(m.id.in_(last_ids))
+    ).all()
+    for row in rows:
+        bind.execute(
+            sa.update(conversations)
+            .where(c.id == row.conversation_id)
+            .values(last_message=row.content, last_message_at=row.created_at, last_sender_id=row.sender_id)
+        )
+    # Conversaciones sin mensajes: se ordenan por su fecha de creación. Se
+    # copia desde Python (no columna a columna en SQL) para que quede con el
+    # mismo formato que escribe la app (clave del cursor de la bandeja)
+    empty = bind.execute(sa.select(c.id, c.created_at).where(c.last_message_at.is_(None))).all()
+    if empty:
+        bind.execute(
+            sa.update(conversations)
+            .where(c.id == sa.bindparam("b_id"))
+            .values(last_message_at=sa.bindparam("b_created_at")),
+            [{"b_id": row.id, "b_created_at": row.created_at or datetime.utcnow()} for row in empty],
+        )
+
+
+def _backfill_message_tokens(bind, batch_size: int = 1000):
+    """Indexa para la búsqueda los mensajes posteriores al último ya indexado."""
+    from app.core.text import tokenize
+
+    m = messages.c
+    last_id = bind.execute(sa.select(sa.func.max(message_tokens.c.message_id))).scalar() or 0
+    while True:
+        rows = bind.execute(
+            sa.select(m.id, m.conversation_id, m.content)
+            .where(m.id > last_id)
+            .order_by(m.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        values = [
+            {"message_id": row.id, "token": token, "conversation_id": row.conversation_id}
+            for row in rows
+            for token in tokenize(row.content)
+        ]
+        if values:
+            bind.execute(message_tokens.insert(), values)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    _create_tables(sa.inspect(bind))
+    _add_columns(sa.inspect(bind), bind.dialect.name)
+
+    inspector = sa.inspect(bind)
+    if inspector.has_table("conversations"):
+        # Debe correr antes de crear el índice único (owner_id, student_id)
+        _merge_duplicate_conversations(bind)
+    _create_indexes(inspector)
+
+    if inspector.has_table("residences"):
+        _backfill_residence_search(bind)
+        _backfill_residence_geohash(bind)
+    if inspector.has_table("conversations") and inspector.has_table("messages"):
+        _backfill_conversation_summaries(bind)
+        _backfill_message_tokens(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, name, _columns, _kwargs in reversed(NEW_INDEXES):
+        if inspector.has_table(table) and name in {i["name"] for i in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
+    if bind.dialect.name != "sqlite":
+        for name, table, _referent, _local_cols, _remote_cols in NEW_FOREIGN_KEYS:
+            if name in {fk["name"] for fk in inspector.get_foreign_keys(table)}:
+                op.drop_constraint(name, table, type_="foreignkey")
+    for table, columns in NEW_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        for column in reversed(columns):
+            if column.name in existing:
+                op.drop_column(table, column.name)
+    for table in ("message_tokens", "owner_stats", "catalog_versions"):
+        if inspector.has_table(table):
+            op.drop_table(table)
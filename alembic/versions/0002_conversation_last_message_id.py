@@ -0,0 +1,61 @@
+"""Id del último mensaje en el resumen de la conversación
+
+send_message decide si un mensaje pasa al resumen comparando ids (no
+fechas: Message.created_at la pone el servidor y last_message_at de una
+conversación recién creada viene de Python, con otra precisión).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+conversations = sa.table(
+    "conversations",
+    sa.column("id", sa.Integer),
+    sa.column("last_message_id", sa.Integer),
+)
+messages = sa.table(
+    "messages",
+    sa.column("id", sa.Integer),
+    sa.column("conversation_id", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("conversations"):
+        return
+    if "last_message_id" not in {c["name"] for c in inspector.get_columns("conversations")}:
+        op.add_column("conversations", sa.Column("last_message_id", sa.Integer, nullable=True))
+    if not inspector.has_table("messages"):
+        return
+
+    # Relleno: el mayor id de mensaje de cada conversación
+    last_ids = (
+        sa.select(sa.func.max(messages.c.id))
+        .where(messages.c.conversation_id == conversations.c.id)
+        .scalar_subquery()
+    )
+    bind.execute(
+        sa.update(conversations)
+        .where(conversations.c.last_message_id.is_(None))
+        .values(last_message_id=last_ids)
+    )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("conversations") and "last_message_id" in {
+        c["name"] for c in inspector.get_columns("conversations")
+    }:
+        op.drop_column("conversations", "last_message_id")
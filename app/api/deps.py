@@ -1,3 +1,4 @@
+import jwt
 from fastapi import Depends, HTTPException, status, Header
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
@@ -19,7 +20,17 @@ def get_current_user(authorization: str = Header(None), db: Session = Depends(ge
             )
 
         token = authorization.split(" ", 1)[1]
-        payload = decode_access_token(token)
+        return get_user_from_token(token, db)
+
+def get_user_from_token(token: str, db: Session) -> User:
+        """Valida el JWT de acceso y devuelve su usuario (también usado por el WebSocket del chat)."""
+        try:
+            payload = decode_access_token(token)
+        except jwt.PyJWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido",
+            )
 
         # Asegurarnos de que `sub` exista y sea convertible a int
         sub = payload.get("sub")
@@ -1,17 +1,117 @@
 # app/api/v1/endpoints/chat.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, case, desc, func, insert, or_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 
-from app.api.deps import get_db, get_current_user, require_role
-from app.models.chat import Conversation, Message
+from app.api.deps import get_db, get_current_user, get_user_from_token, require_role
+from app.db.session import SessionLocal
+from app.models.chat import Conversation, Message, MessageToken
 from app.models.user import User, UserRole
-from app.schemas.chat import ConversationBase, MessageOut, MessageCreate
+from app.schemas.chat import (
+    ConversationBase,
+    ConversationPage,
+    ConversationReadOut,
+    MessageCreate,
+    MessageOut,
+    MessageSearchHit,
+    MessageSearchPage,
+    MessageSync,
+)
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.core.responses import ListSerializer, model_response
+from app.core.text import like_prefix, tokenize
+from app.services.chat_hub import chat_hub
 
 router = APIRouter()
+CONVERSATION_LIST = ListSerializer(ConversationBase)
+MESSAGE_LIST = ListSerializer(MessageOut)
+SEARCH_HIT_LIST = ListSerializer(MessageSearchHit)
+MAX_SYNC_WAIT_SECONDS = 30
+# Ids por debajo de since_id que /sync vuelve a revisar: un mensaje con id menor
+# que la marca de agua puede hacerse visible después (su transacción confirmó
+# más tarde que la de un id mayor). El cliente descarta duplicados por id.
+SYNC_OVERLAP_IDS = 200
+MAX_SEARCH_TERMS = 8
+
+
+def _read_columns(user_id: int):
+    """Columnas (último leído, no leídos) del lado de la conversación que corresponde a `user_id`."""
+    last_read = case(
+        (Conversation.owner_id == user_id, Conversation.owner_last_read_message_id),
+        (Conversation.student_id == user_id, Conversation.student_last_read_message_id),
+    )
+    unread = case(
+        (Conversation.owner_id == user_id, Conversation.owner_unread_count),
+        (Conversation.student_id == user_id, Conversation.student_unread_count),
+        else_=0,
+    )
+    return last_read, unread
+
+def _conversation_summaries(db: Session, user_id: int):
+    """
+    Consulta de resúmenes de conversación en una sola pasada: nombres de los
+    participantes por join, último mensaje guardado en Conversation y estado
+    de lectura de `user_id`. Columnas etiquetadas como ConversationBase.
+    """
+    owner = aliased(User)
+    student = aliased(User)
+    last_read, unread = _read_columns(user_id)
+    return (
+        db.query(
+            Conversation.id.label("id"),
+            Conversation.owner_id.label("owner_id"),
+            Conversation.student_id.label("student_id"),
+            Conversation.created_at.label("created_at"),
+            owner.full_name.label("owner_name"),
+            student.full_name.label("student_name"),
+            Conversation.last_message.label("last_message"),
+            Conversation.last_message_at.label("last_message_at"),
+            Conversation.last_sender_id.label("last_sender_id"),
+            last_read.label("last_read_message_id"),
+            unread.label("unread_count"),
+        )
+        .outerjoin(owner, owner.id == Conversation.owner_id)
+        .outerjoin(student, student.id == Conversation.student_id)
+    )
+
+
+def _insert_conversation_if_missing(db: Session, owner_id: int, student_id: int) -> None:
+    """
+    INSERT que no falla si otra petición ya creó la conversación
+    (índice único uq_conversations_owner_student): ON CONFLICT DO NOTHING en
+    PostgreSQL/SQLite, INSERT IGNORE en MySQL y SAVEPOINT en otros motores.
+    """
+    values = dict(owner_id=owner_id, student_id=student_id)
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql_insert(Conversation).values(**values).on_conflict_do_nothing(
+            index_elements=["owner_id", "student_id"]
+        )
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(Conversation).values(**values).on_conflict_do_nothing(
+            index_elements=["owner_id", "student_id"]
+        )
+    elif dialect in ("mysql", "mariadb"):
+        stmt = insert(Conversation).values(**values).prefix_with("IGNORE")
+    else:
+        try:
+            with db.begin_nested():
+                db.execute(insert(Conversation).values(**values))
+        except IntegrityError:
+            pass
+        return
+    db.execute(stmt)
+
 
 # 👉 1) Obtener o crear conversación OWNER ↔ STUDENT
+#    Lectura por el índice único; si no existe, insert-or-fetch seguro ante
+#    peticiones simultáneas y relectura con la misma consulta con joins.
 @router.post("/conversations/by-users", response_model=ConversationBase)
 def get_or_create_conversation(
     owner_id: int,
@@ -23,49 +123,38 @@ def get_or_create_conversation(
     if current.role != UserRole.SUPERADMIN and current.id not in [owner_id, student_id]:
         raise HTTPException(status_code=403, detail="No autorizado")
 
-    convo = (
-        db.query(Conversation)
-        .filter(
-            Conversation.owner_id == owner_id,
-            Conversation.student_id == student_id,
-        )
-        .first()
+    q = _conversation_summaries(db, current.id).filter(
+        Conversation.owner_id == owner_id,
+        Conversation.student_id == student_id,
     )
-    if not convo:
-        convo = Conversation(owner_id=owner_id, student_id=student_id)
-        db.add(convo)
+    row = q.first()
+    if row is None:
+        _insert_conversation_if_missing(db, owner_id, student_id)
         db.commit()
-        db.refresh(convo)
-
-    # datos extra (nombres + último mensaje)
-    owner = db.query(User).get(convo.owner_id)
-    student = db.query(User).get(convo.student_id)
-    last_msg = (
-        db.query(Message)
-        .filter(Message.conversation_id == convo.id)
-        .order_by(desc(Message.created_at))
-        .first()
-    )
+        row = q.first()
+        # INSERT IGNORE (MySQL) convierte en aviso cualquier error, no solo el
+        # duplicado: si la fila no aparece, que el cliente reintente
+        if row is None:
+            raise HTTPException(
+                status_code=409,
+                detail="No se pudo crear la conversación, intenta nuevamente",
+                headers={"Retry-After": "1"},
+            )
 
-    return ConversationBase(
-        id=convo.id,
-        owner_id=convo.owner_id,
-        student_id=convo.student_id,
-        created_at=convo.created_at,
-        owner_name=owner.full_name if owner else None,
-        student_name=student.full_name if student else None,
-        last_message=last_msg.content if last_msg else None,
-        last_message_at=last_msg.created_at if last_msg else None,
-    )
+    return ConversationBase.model_validate(row, from_attributes=True)
 
 
 # 👉 2) Listar conversaciones del usuario actual
-@router.get("/conversations", response_model=List[ConversationBase])
+#    Una sola consulta (nombres por join + resumen del último mensaje
+#    guardado en Conversation), ordenada por último mensaje y paginada por cursor.
+@router.get("/conversations", response_model=ConversationPage)
 def list_my_conversations(
     db: Session = Depends(get_db),
     current = Depends(get_current_user),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
-    q = db.query(Conversation)
+    q = _conversation_summaries(db, current.id)
 
     if current.role == UserRole.OWNER:
         q = q.filter(Conversation.owner_id == current.id)
@@ -75,41 +164,46 @@ def list_my_conversations(
         # ve todos los chats
         pass
     else:
-        return []
-
-    convos = q.order_by(desc(Conversation.created_at)).all()
-
-    results: List[ConversationBase] = []
-    for c in convos:
-        owner = db.query(User).get(c.owner_id)
-        student = db.query(User).get(c.student_id)
-        last_msg = (
-            db.query(Message)
-            .filter(Message.conversation_id == c.id)
-            .order_by(desc(Message.created_at))
-            .first()
-        )
-        results.append(
-            ConversationBase(
-                id=c.id,
-                owner_id=c.owner_id,
-                student_id=c.student_id,
-                created_at=c.created_at,
-                owner_name=owner.full_name if owner else None,
-                student_name=student.full_name if student else None,
-                last_message=last_msg.content if last_msg else None,
-                last_message_at=last_msg.created_at if last_msg else None,
+        return ConversationPage(items=[])
+
+    after = decode_cursor(cursor, 2)
+    if after is not None:
+        try:
+            after_at, after_id = datetime.fromisoformat(after[0]), int(after[1])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        q = q.filter(
+            or_(
+                Conversation.last_message_at < after_at,
+                and_(Conversation.last_message_at == after_at, Conversation.id < after_id),
             )
         )
-    return results
+
+    rows = q.order_by(desc(Conversation.last_message_at), desc(Conversation.id)).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].last_message_at.isoformat(), rows[-1].id)
+
+    return model_response(
+        ConversationPage.model_construct(items=CONVERSATION_LIST.validate(rows), next_cursor=next_cursor)
+    )
 
 
-# 👉 3) Listar mensajes de una conversación
+# 👉 3) Listar mensajes de una conversación (paginado por id)
+#    - sin cursores: los `limit` mensajes más recientes
+#    - before_id: los `limit` anteriores a ese mensaje (scroll hacia arriba)
+#    - after_id: los `limit` siguientes a ese mensaje (mensajes nuevos)
+#    Siempre se devuelven en orden ascendente.
 @router.get("/messages/{conversation_id}", response_model=List[MessageOut])
 def list_messages(
     conversation_id: int,
     db: Session = Depends(get_db),
     current = Depends(get_current_user),
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
 ):
     convo = db.query(Conversation).get(conversation_id)
     if not convo:
@@ -118,27 +212,248 @@ def list_messages(
     if current.role != UserRole.SUPERADMIN and current.id not in [convo.owner_id, convo.student_id]:
         raise HTTPException(status_code=403, detail="No autorizado")
 
-    msgs = (
-        db.query(Message)
-        .filter(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at.asc())
-        .all()
-    )
-
-    result: List[MessageOut] = []
-    for m in msgs:
-        sender = db.query(User).get(m.sender_id)
-        result.append(
-            MessageOut(
-                id=m.id,
-                conversation_id=m.conversation_id,
-                sender_id=m.sender_id,
-                content=m.content,
-                created_at=m.created_at,
-                sender_name=sender.full_name if sender else None,
+    q = db.query(
+        Message.id.label("id"),
+        Message.conversation_id.label("conversation_id"),
+        Message.sender_id.label("sender_id"),
+        Message.content.label("content"),
+        Message.created_at.label("created_at"),
+    ).filter(Message.conversation_id == conversation_id)
+
+    if before_id is not None:
+        q = q.filter(Message.id < before_id)
+    if after_id is not None:
+        q = q.filter(Message.id > after_id)
+        msgs = q.order_by(Message.id.asc()).limit(limit).all()
+    else:
+        msgs = q.order_by(Message.id.desc()).limit(limit).all()[::-1]
+
+    # Nombres resueltos una vez por conversación (participantes + otros remitentes, p. ej. superadmin)
+    sender_ids = {convo.owner_id, convo.student_id} | {m.sender_id for m in msgs}
+    names = dict(
+        db.query(User.id, User.full_name).filter(User.id.in_([i for i in sender_ids if i is not None])).all()
+    )
+
+    return [
+        MessageOut(
+            id=m.id,
+            conversation_id=m.conversation_id,
+            sender_id=m.sender_id,
+            content=m.content,
+            created_at=m.created_at,
+            sender_name=names.get(m.sender_id),
+        )
+        for m in msgs
+    ]
+
+
+# 👉 3b) Sincronización incremental: mensajes nuevos de todas mis conversaciones
+#    since_id es la marca de agua del cliente (último Message.id recibido).
+#    Con wait > 0 la petición espera (sin bloquear un hilo ni una conexión de BD)
+#    hasta que send_message avise de un mensaje nuevo o venza el tiempo.
+#    ⚠️ La respuesta repite mensajes de los últimos SYNC_OVERLAP_IDS ids bajo
+#    since_id (los que confirmaron tarde); el cliente debe deduplicar por id.
+@router.get("/sync", response_model=MessageSync)
+async def sync_messages(
+    since_id: int = Query(default=0, ge=0),
+    wait: int = Query(default=0, ge=0, le=MAX_SYNC_WAIT_SECONDS),
+    limit: int = Query(default=MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    user_id = current.id
+
+    # Suscripción antes de consultar: un mensaje que llegue entre la consulta
+    # y la espera igual despierta la petición
+    async with chat_hub.subscribe(user_id) as queue:
+        rows = await asyncio.to_thread(_messages_since, db, user_id, since_id, limit)
+        # Solo se espera si no hay nada por encima de la marca de agua: la
+        # ventana de solape casi nunca está vacía
+        if wait and not any(row.id > since_id for row in rows):
+            try:
+                await asyncio.wait_for(queue.get(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                rows = await asyncio.to_thread(_messages_since, db, user_id, since_id, limit)
+
+    overlap = [row for row in rows if row.id <= since_id]
+    fresh = [row for row in rows if row.id > since_id]
+    has_more = len(fresh) > limit
+    fresh = fresh[:limit]
+    return MessageSync(
+        messages=MESSAGE_LIST.validate(overlap + fresh),
+        high_water=fresh[-1].id if fresh else since_id,
+        has_more=has_more,
+    )
+
+
+def _messages_since(db: Session, user_id: int, since_id: int, limit: int):
+    """
+    Una sola consulta: mensajes con id > since_id - SYNC_OVERLAP_IDS en
+    conversaciones del usuario, con el nombre del remitente. La ventana de
+    solape tiene como mucho SYNC_OVERLAP_IDS filas, así que el límite deja
+    siempre ver si hay más de `limit` mensajes nuevos. Cierra la sesión al
+    terminar para que la conexión vuelva al pool mientras la petición espera.
+    """
+    floor = max(since_id - SYNC_OVERLAP_IDS, 0)
+    try:
+        return (
+            db.query(
+                Message.id.label("id"),
+                Message.conversation_id.label("conversation_id"),
+                Message.sender_id.label("sender_id"),
+                Message.content.label("content"),
+                Message.created_at.label("created_at"),
+                User.full_name.label("sender_name"),
+            )
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .outerjoin(User, User.id == Message.sender_id)
+            .filter(
+                or_(Conversation.owner_id == user_id, Conversation.student_id == user_id),
+                Message.id > floor,
             )
+            .order_by(Message.id.asc())
+            .limit(limit + (since_id - floor) + 1)
+            .all()
+        )
+    finally:
+        db.close()
+
+
+# 👉 3c) Marcar como leída una conversación (hasta message_id o hasta el último mensaje)
+@router.post("/conversations/{conversation_id}/read", response_model=ConversationReadOut)
+def mark_conversation_read(
+    conversation_id: int,
+    message_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    # 🔒 Lock de la conversación: un send_message concurrente suma su no leído
+    #    después de este recálculo (o este recálculo ya ve su mensaje)
+    convo = (
+        db.query(Conversation)
+        .filter(Conversation.id == conversation_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if not convo:
+        raise HTTPException(status_code=404, detail="Conversación no encontrada")
+
+    if current.id == convo.owner_id:
+        side = "owner"
+    elif current.id == convo.student_id:
+        side = "student"
+    else:
+        raise HTTPException(status_code=403, detail="Solo los participantes pueden marcar como leído")
+
+    # Nunca más allá del último mensaje de esta conversación: un id mayor
+    # (o de otra conversación) ocultaría como leídos mensajes aún no enviados
+    last_message_id = (
+        db.query(func.max(Message.id)).filter(Message.conversation_id == conversation_id).scalar()
+    )
+    if message_id is None or last_message_id is None or message_id > last_message_id:
+        message_id = last_message_id
+
+    last_read = getattr(convo, f"{side}_last_read_message_id")
+    if message_id is not None and (last_read is None or message_id > last_read):
+        last_read = message_id
+
+    # No leídos restantes: mensajes de otros posteriores al último leído
+    # (rango sobre ix_messages_conversation_id_id; 0 al leer hasta el final)
+    unread_q = db.query(func.count(Message.id)).filter(
+        Message.conversation_id == conversation_id,
+        Message.sender_id != current.id,
+    )
+    if last_read is not None:
+        unread_q = unread_q.filter(Message.id > last_read)
+    unread_count = unread_q.scalar() or 0
+
+    setattr(convo, f"{side}_last_read_message_id", last_read)
+    setattr(convo, f"{side}_unread_count", unread_count)
+    db.commit()
+
+    return ConversationReadOut(
+        conversation_id=conversation_id,
+        last_read_message_id=last_read,
+        unread_count=unread_count,
+    )
+
+
+# 👉 3d) Buscar en los mensajes de mis conversaciones (SUPERADMIN: en todas, para moderación)
+#    Índice invertido message_tokens: cada término de la búsqueda se compara
+#    por prefijo ("depos" encuentra "deposito") y deben aparecer todos.
+#    Resultados de más reciente a más antiguo, paginados por cursor.
+@router.get("/search", response_model=MessageSearchPage)
+def search_messages(
+    q: str = Query(..., min_length=2, max_length=200),
+    conversation_id: Optional[int] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    terms = tokenize(q)[:MAX_SEARCH_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="La búsqueda no contiene términos válidos")
+
+    after = decode_cursor(cursor, 1)
+    if after is not None and not isinstance(after[0], int):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    # Primer término: rango sobre ix_message_tokens_token_conversation, ya
+    # acotado a las conversaciones del usuario
+    first = (
+        db.query(MessageToken.message_id)
+        .filter(MessageToken.token.like(like_prefix(terms[0]), escape="\\"))
+    )
+    if conversation_id is not None:
+        first = first.filter(MessageToken.conversation_id == conversation_id)
+    if current.role != UserRole.SUPERADMIN:
+        mine = db.query(Conversation.id).filter(
+            or_(Conversation.owner_id == current.id, Conversation.student_id == current.id)
+        )
+        first = first.filter(MessageToken.conversation_id.in_(mine))
+
+    hits = (
+        db.query(
+            Message.id.label("id"),
+            Message.conversation_id.label("conversation_id"),
+            Message.sender_id.label("sender_id"),
+            Message.content.label("content"),
+            Message.created_at.label("created_at"),
+            User.full_name.label("sender_name"),
+            Conversation.owner_id.label("owner_id"),
+            Conversation.student_id.label("student_id"),
+        )
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .outerjoin(User, User.id == Message.sender_id)
+        .filter(Message.id.in_(first))
+    )
+
+    # Resto de términos: el mismo mensaje debe contenerlos (clave primaria message_id + token)
+    for term in terms[1:]:
+        other = aliased(MessageToken)
+        hits = hits.filter(
+            db.query(other.message_id)
+            .filter(other.message_id == Message.id, other.token.like(like_prefix(term), escape="\\"))
+            .exists()
         )
-    return result
+
+    if after is not None:
+        hits = hits.filter(Message.id < after[0])
+
+    rows = hits.order_by(Message.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+
+    return model_response(
+        MessageSearchPage.model_construct(items=SEARCH_HIT_LIST.validate(rows), next_cursor=next_cursor)
+    )
 
 
 # 👉 4) Enviar mensaje
@@ -161,16 +476,102 @@ def send_message(
         content=data.content,
     )
     db.add(msg)
-    db.commit()
+    db.flush()
     db.refresh(msg)
 
-    sender = db.query(User).get(msg.sender_id)
+    # 🔎 Índice de búsqueda (una sola sentencia para todos los términos)
+    tokens = tokenize(msg.content)
+    if tokens:
+        db.execute(
+            insert(MessageToken),
+            [{"message_id": msg.id, "token": token, "conversation_id": msg.conversation_id} for token in tokens],
+        )
+
+    # 📨 Resumen en la conversación (sin retroceder si otro mensaje llegó después)
+    db.query(Conversation).filter(
+        Conversation.id == convo.id,
+        or_(Conversation.last_message_id.is_(None), Conversation.last_message_id < msg.id),
+    ).update(
+        {
+            Conversation.last_message: msg.content,
+            Conversation.last_message_id: msg.id,
+            Conversation.last_message_at: msg.created_at,
+            Conversation.last_sender_id: msg.sender_id,
+        },
+        synchronize_session=False,
+    )
+
+    # 👀 +1 no leído para cada participante que no es el remitente (UPDATE atómico)
+    unread = {}
+    if current.id != convo.owner_id:
+        unread[Conversation.owner_unread_count] = Conversation.owner_unread_count + 1
+    if current.id != convo.student_id:
+        unread[Conversation.student_unread_count] = Conversation.student_unread_count + 1
+    db.query(Conversation).filter(Conversation.id == convo.id).update(unread, synchronize_session=False)
 
-    return MessageOut(
+    out = MessageOut(
         id=msg.id,
         conversation_id=msg.conversation_id,
         sender_id=msg.sender_id,
         content=msg.content,
         created_at=msg.created_at,
-        sender_name=sender.full_name if sender else None,
+        sender_name=current.full_name,
     )
+    participants = (convo.owner_id, convo.student_id)
+    db.commit()
+
+    # 📡 Entrega en tiempo real a los participantes conectados por WebSocket
+    chat_hub.publish_to_users(participants, {"type": "message", "message": out.model_dump(mode="json")})
+
+    return out
+
+
+# 👉 5) WebSocket: recibir en tiempo real los mensajes de mis conversaciones
+#    Autenticación con el mismo JWT: ?token=<access_token> o cabecera Authorization.
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket, token: Optional[str] = None):
+    if token is None:
+        authorization = websocket.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization.split(" ", 1)[1]
+
+    user_id = await asyncio.to_thread(_user_id_from_token, token) if token else None
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with chat_hub.subscribe(user_id) as queue:
+        # El cliente no necesita enviar nada; se lee solo para detectar el cierre
+        receiver = asyncio.create_task(_wait_disconnect(websocket))
+        try:
+            while True:
+                getter = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    break
+                await websocket.send_json(getter.result())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
+
+
+def _user_id_from_token(token: str) -> Optional[int]:
+    # La sesión de BD solo se usa para autenticar; no se retiene durante la conexión
+    db = SessionLocal()
+    try:
+        return get_user_from_token(token, db).id
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
@@ -1,8 +1,9 @@
 from datetime import datetime
 import os
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from fastapi.responses import FileResponse
 
@@ -16,6 +17,7 @@ from app.models.user import UserRole, User
 from app.models.contract import Contract
 from app.models.contract_details import ContractDetails
 from app.schemas.contract import ContractOut
+from app.services.export import export_response
 
 router = APIRouter()
 
@@ -255,6 +257,44 @@ def list_contracts(
     )
     return contracts
 
+CONTRACT_EXPORT_HEADER = (
+    "id", "reservation_id", "details_id", "owner_id", "student_id", "room_id",
+    "monthly_price", "deposit_amount", "payment_day", "start_date", "end_date",
+    "details_status", "pdf_url", "created_at",
+)
+
+
+@router.get("/export")
+def export_contracts(
+    fmt: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    current: User = Depends(require_role(UserRole.SUPERADMIN)),
+):
+    """
+    Exporta todos los contratos con sus datos económicos (solo SUPERADMIN),
+    en streaming CSV o NDJSON. Se declara antes de /{contract_id}.
+    """
+    stmt = (
+        select(
+            Contract.id,
+            Contract.reservation_id,
+            Contract.details_id,
+            ContractDetails.owner_id,
+            ContractDetails.student_id,
+            ContractDetails.room_id,
+            ContractDetails.monthly_price,
+            ContractDetails.deposit_amount,
+            ContractDetails.payment_day,
+            ContractDetails.start_date,
+            ContractDetails.end_date,
+            ContractDetails.status,
+            Contract.pdf_url,
+            Contract.created_at,
+        )
+        .outerjoin(ContractDetails, ContractDetails.id == Contract.details_id)
+        .order_by(Contract.id)
+    )
+    return export_response(stmt, CONTRACT_EXPORT_HEADER, fmt, "contracts")
+
 # ... existing code ...
 
 @router.get("/{contract_id}", response_model=ContractOut)
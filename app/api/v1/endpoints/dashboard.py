@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, require_role
+from app.models.owner_stats import OwnerStats
+from app.models.user import User, UserRole
+from app.schemas.dashboard import OwnerDashboardOut
+from app.services import owner_stats
+
+router = APIRouter()
+
+
+# 📊 Dashboard del propietario (lectura por clave primaria de owner_stats)
+@router.get("/owner/{owner_id}", response_model=OwnerDashboardOut)
+def owner_dashboard(
+    owner_id: int,
+    db: Session = Depends(get_db),
+    current: User = Depends(require_role(UserRole.OWNER, UserRole.SUPERADMIN)),
+):
+    if current.role != UserRole.SUPERADMIN and current.id != owner_id:
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+    stats = db.get(OwnerStats, owner_id)
+    if stats is None:
+        # Primera consulta de este owner: se calcula una vez y queda guardado
+        owner = db.get(User, owner_id)
+        if owner is None or owner.role != UserRole.OWNER:
+            raise HTTPException(status_code=404, detail="Propietario no encontrado")
+        stats = owner_stats.recompute(db, owner_id)
+        db.commit()
+        db.refresh(stats)
+
+    return OwnerDashboardOut(
+        owner_id=stats.owner_id,
+        pending=stats.pending,
+        confirmed=stats.confirmed,
+        cancelled=stats.cancelled,
+        rejected=stats.rejected,
+        completed=stats.completed,
+        rooms_total=stats.rooms_total,
+        rooms_available=stats.rooms_available,
+        rooms_occupied=stats.rooms_total - stats.rooms_available,
+        expected_monthly_revenue=stats.expected_monthly_revenue,
+        updated_at=stats.updated_at,
+    )
@@ -4,8 +4,10 @@ from typing import List
 from app.api.deps import get_db, get_current_user
 from app.models.favorite import Favorite
 from app.schemas.favorite import FavoriteToggle, FavoriteOut
+from app.core.responses import ListSerializer
 
 router = APIRouter()
+FAVORITE_OUT_LIST = ListSerializer(FavoriteOut)
 
 @router.post("/toggle", response_model=FavoriteOut)
 def toggle_favorite(data: FavoriteToggle, db: Session = Depends(get_db), current=Depends(get_current_user)):
@@ -33,5 +35,9 @@ def toggle_favorite(data: FavoriteToggle, db: Session = Depends(get_db), current
 
 @router.get("/", response_model=List[FavoriteOut])
 def list_favorites(db: Session = Depends(get_db), current=Depends(get_current_user)):
-    items = db.query(Favorite).filter(Favorite.user_id == current.id).all()
-    return [FavoriteOut(id=i.id, user_id=i.user_id, room_id=i.room_id, residence_id=i.residence_id) for i in items]
+    items = (
+        db.query(Favorite.id, Favorite.user_id, Favorite.room_id, Favorite.residence_id)
+        .filter(Favorite.user_id == current.id)
+        .all()
+    )
+    return FAVORITE_OUT_LIST.response(items)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Literal, Optional
 
 from app.api.deps import get_db, require_role, get_current_user
 from app.models.residence import Residence
@@ -10,10 +11,53 @@ from app.models.reservation import Reservation, ReservationStatus
 from app.models.room import Room
 from app.models.contract_details import ContractDetails, ContractDetailsStatus
 from app.schemas.contract_details import ContractDetailsStatus
-from app.schemas.reservation import ReservationCreate, ReservationOut
-
-from sqlalchemy.orm import aliased
+from app.schemas.reservation import (
+    ReservationBatchItemResult,
+    ReservationBatchRequest,
+    ReservationBatchResult,
+    ReservationCreate,
+    ReservationOut,
+    ReservationPage,
+)
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.core.responses import ListSerializer, model_response
+from app.services.catalog_version import bump_version
+from app.services.availability import confirmed_conflicts, reservation_overlaps, to_naive_utc
+from app.services import owner_stats
+from app.services.room_lock import lock_conflicts_as_409, lock_room
+from app.services.export import export_response
+
+from sqlalchemy.orm import aliased, joinedload
 router = APIRouter()
+RESERVATION_OUT_LIST = ListSerializer(ReservationOut)
+MAX_BATCH_RESERVATIONS = 500
+NOT_PENDING_DETAIL = "La reserva ya no está pendiente"
+
+
+def _contract_draft(res: Reservation, room: Room) -> dict:
+    """Valores del ContractDetails (borrador editable) que se crea al confirmar una reserva."""
+    return dict(
+        reservation_id=res.id,
+        room_id=room.id,
+        student_id=res.student_id,
+        owner_id=room.residence.owner_id,
+        title=f"Contrato de alquiler - {room.title}",
+        description=f"Detalles del contrato para la habitación '{room.title}' en la residencia '{room.residence.name}'.",
+        monthly_price=room.price_per_month,
+        deposit_amount=room.price_per_month,   # Ejemplo: 1 mes de garantía (ajustable en el form)
+        payment_day=5,                         # Ejemplo por defecto, editable
+        start_date=res.start_date,
+        end_date=res.end_date,
+        included_services="Agua, luz, internet (ejemplo, editable).",
+        rules=(
+            "1. El estudiante se compromete a respetar las normas internas de la residencia.\n"
+            "2. No se permiten fiestas ruidosas después de las 22:00.\n"
+            "3. Mantener la limpieza y el orden de los espacios comunes.\n"
+        ),
+        extra_conditions="",
+        status=ContractDetailsStatus.DRAFT,
+    )
+
 
 # --------------------------------------------------------------------
 # 🟢 Crear reserva (solo estudiante o superadmin)
@@ -25,60 +69,59 @@ def create_reservation(
     db: Session = Depends(get_db),
     current: User = Depends(require_role(UserRole.STUDENT, UserRole.SUPERADMIN)),
 ):
-    room = db.query(Room).get(data.room_id)
-    if not room or not room.is_available:
-        raise HTTPException(status_code=404, detail="Habitación no disponible")
-
-    # 🔍 1) Validar si el estudiante ya tiene una reserva activa
-    #    (activa = PENDING o CONFIRMED)
-    if current.role == UserRole.STUDENT:
-        active_statuses = [ReservationStatus.PENDING, ReservationStatus.CONFIRMED]
-        active_reservation = (
-            db.query(Reservation)
-            .filter(
-                Reservation.student_id == current.id,
-                Reservation.status.in_(active_statuses),
+    # 🔒 Lock de la habitación: las comprobaciones y el INSERT quedan atómicos
+    with lock_conflicts_as_409(db):
+        room = lock_room(db, data.room_id)
+        if not room or not room.is_available:
+            raise HTTPException(status_code=404, detail="Habitación no disponible")
+
+        # 🔍 1) Validar si el estudiante ya tiene una reserva activa
+        #    (activa = PENDING o CONFIRMED). Se bloquea la fila del estudiante
+        #    para que dos peticiones simultáneas suyas no pasen ambas.
+        if current.role == UserRole.STUDENT:
+            db.query(User.id).filter(User.id == current.id).with_for_update().first()
+            active_statuses = [ReservationStatus.PENDING, ReservationStatus.CONFIRMED]
+            active_reservation = (
+                db.query(Reservation.id)
+                .filter(
+                    Reservation.student_id == current.id,
+                    Reservation.status.in_(active_statuses),
+                )
+                .with_for_update(read=True)
+                .first()
             )
+            if active_reservation:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Ya tienes una reserva activa. No puedes crear otra.",
+                )
+
+        # 🔍 2) Verificar solapamiento de fechas en la habitación (reservas CONFIRMED)
+        #    Un solo predicado de intervalo, servido por ix_reservations_room_status_dates
+        conflicts = (
+            confirmed_conflicts(db, data.room_id, data.start_date, data.end_date)
+            .with_for_update(read=True)
             .first()
         )
-        if active_reservation:
+
+        if conflicts:
             raise HTTPException(
                 status_code=400,
-                detail="Ya tienes una reserva activa. No puedes crear otra.",
+                detail="Rango de fechas se solapa con otra reserva confirmada",
             )
 
-    # 🔍 2) Verificar solapamiento de fechas en la habitación (reservas CONFIRMED)
-    conflicts = (
-        db.query(Reservation)
-        .filter(
-            Reservation.room_id == data.room_id,
-            Reservation.status == ReservationStatus.CONFIRMED,
-            or_(
-                and_(Reservation.start_date <= data.start_date, Reservation.end_date > data.start_date),
-                and_(Reservation.start_date < data.end_date, Reservation.end_date >= data.end_date),
-                and_(Reservation.start_date >= data.start_date, Reservation.end_date <= data.end_date),
-            ),
+        # 3) Crear reserva en estado PENDING
+        res = Reservation(
+            room_id=data.room_id,
+            student_id=current.id if current.role == UserRole.STUDENT else None,
+            start_date=data.start_date,
+            end_date=data.end_date,
+            status=ReservationStatus.PENDING,
         )
-        .first()
-    )
-
-    if conflicts:
-        raise HTTPException(
-            status_code=400,
-            detail="Rango de fechas se solapa con otra reserva confirmada",
-        )
-
-    # 3) Crear reserva en estado PENDING
-    res = Reservation(
-        room_id=data.room_id,
-        student_id=current.id if current.role == UserRole.STUDENT else None,
-        start_date=data.start_date,
-        end_date=data.end_date,
-        status=ReservationStatus.PENDING,
-    )
-    db.add(res)
-    db.commit()
-    db.refresh(res)
+        db.add(res)
+        owner_stats.record(db, room.residence.owner_id, owner_stats.status_change(None, ReservationStatus.PENDING))
+        db.commit()
+        db.refresh(res)
 
     return ReservationOut(
         id=res.id,
@@ -101,52 +144,69 @@ def confirm_reservation(
     if not res:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
 
-    room = db.query(Room).get(res.room_id)
-    if not room:
-        raise HTTPException(status_code=404, detail="Habitación no encontrada")
+    # 🔒 Lock de la habitación y relectura de la reserva ya con el lock tomado
+    with lock_conflicts_as_409(db):
+        room = lock_room(db, res.room_id)
+        if not room:
+            raise HTTPException(status_code=404, detail="Habitación no encontrada")
+        res = (
+            db.query(Reservation)
+            .filter(Reservation.id == reservation_id)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
 
-    # Solo el owner de la residencia o un superadmin puede confirmar
-    if current.role != UserRole.SUPERADMIN and room.residence.owner_id != current.id:
-        raise HTTPException(status_code=403, detail="No autorizado")
+        # Solo el owner de la residencia o un superadmin puede confirmar
+        if current.role != UserRole.SUPERADMIN and room.residence.owner_id != current.id:
+            raise HTTPException(status_code=403, detail="No autorizado")
+
+        if res.status != ReservationStatus.PENDING:
+            raise HTTPException(status_code=409, detail=NOT_PENDING_DETAIL)
+
+        # Evitar doble reserva: otra reserva ya confirmada que se solape
+        conflict = (
+            confirmed_conflicts(db, room.id, res.start_date, res.end_date)
+            .filter(Reservation.id != res.id)
+            .with_for_update(read=True)
+            .first()
+        )
+        if conflict:
+            raise HTTPException(
+                status_code=409,
+                detail="Rango de fechas se solapa con otra reserva confirmada",
+            )
+
+        previous_status = res.status
+        room_before = owner_stats.room_contribution(room.is_available, room.price_per_month)
+
+        # Cambiar estado a CONFIRMED
+        res.status = ReservationStatus.CONFIRMED
+
+        # Marcar habitación como no disponible
+        room.is_available = False
 
-    # Cambiar estado a CONFIRMED
-    res.status = ReservationStatus.CONFIRMED
-
-    # Marcar habitación como no disponible
-    room.is_available = False
-
-    # Si ya existen detalles para esta reserva, no crear otro
-    existing_details = db.query(ContractDetails).filter(
-        ContractDetails.reservation_id == res.id
-    ).first()
-
-    if not existing_details:
-        # Crear ContractDetails pre-llenado y editable
-        details = ContractDetails(
-            reservation_id=res.id,
-            room_id=room.id,
-            student_id=res.student_id,
-            owner_id=room.residence.owner_id,
-            title=f"Contrato de alquiler - {room.title}",
-            description=f"Detalles del contrato para la habitación '{room.title}' en la residencia '{room.residence.name}'.",
-            monthly_price=room.price_per_month,
-            deposit_amount=room.price_per_month,   # Ejemplo: 1 mes de garantía (ajustable en el form)
-            payment_day=5,                         # Ejemplo por defecto, editable
-            start_date=res.start_date,
-            end_date=res.end_date,
-            included_services="Agua, luz, internet (ejemplo, editable).",
-            rules=(
-                "1. El estudiante se compromete a respetar las normas internas de la residencia.\n"
-                "2. No se permiten fiestas ruidosas después de las 22:00.\n"
-                "3. Mantener la limpieza y el orden de los espacios comunes.\n"
-            ),
-            extra_conditions="",
-            status=ContractDetailsStatus.DRAFT,
+        # 📊 Resumen del owner: cambio de estado + habitación pasa a ocupada
+        owner_stats.record(
+            db,
+            room.residence.owner_id,
+            owner_stats.status_change(previous_status, ReservationStatus.CONFIRMED),
+            owner_stats.room_change(room_before, owner_stats.room_contribution(False, room.price_per_month)),
         )
-        db.add(details)
 
-    db.commit()
-    db.refresh(res)
+        # Si ya existen detalles para esta reserva, no crear otro
+        existing_details = db.query(ContractDetails).filter(
+            ContractDetails.reservation_id == res.id
+        ).first()
+
+        if not existing_details:
+            # Crear ContractDetails pre-llenado y editable
+            details = ContractDetails(**_contract_draft(res, room))
+            db.add(details)
+
+        bump_version(db, "rooms")
+        db.commit()
+        db.refresh(res)
 
     return ReservationOut(
         id=res.id,
@@ -168,16 +228,33 @@ def reject_reservation(
     if not res:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
 
-    room = db.query(Room).get(res.room_id)
-    if not room:
-        raise HTTPException(status_code=404, detail="Habitación no encontrada")
+    # 🔒 Mismo lock que confirm: una confirmación y un rechazo simultáneos
+    #    de la misma reserva no pueden aplicarse los dos
+    with lock_conflicts_as_409(db):
+        room = lock_room(db, res.room_id)
+        if not room:
+            raise HTTPException(status_code=404, detail="Habitación no encontrada")
+        res = (
+            db.query(Reservation)
+            .filter(Reservation.id == reservation_id)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+
+        if current.role != UserRole.SUPERADMIN and room.residence.owner_id != current.id:
+            raise HTTPException(status_code=403, detail="No autorizado")
 
-    if current.role != UserRole.SUPERADMIN and room.residence.owner_id != current.id:
-        raise HTTPException(status_code=403, detail="No autorizado")
+        if res.status != ReservationStatus.PENDING:
+            raise HTTPException(status_code=409, detail=NOT_PENDING_DETAIL)
 
-    res.status = ReservationStatus.REJECTED
-    db.commit()
-    db.refresh(res)
+        previous_status = res.status
+        res.status = ReservationStatus.REJECTED
+        owner_stats.record(
+            db, room.residence.owner_id, owner_stats.status_change(previous_status, ReservationStatus.REJECTED)
+        )
+        db.commit()
+        db.refresh(res)
 
     return ReservationOut(
         id=res.id,
@@ -188,20 +265,215 @@ def reject_reservation(
         status=res.status,
     )
 
+
+# --------------------------------------------------------------------
+# 📦 Confirmar / rechazar reservas en lote (una sola transacción)
+# --------------------------------------------------------------------
+@router.post("/batch", response_model=ReservationBatchResult)
+def batch_update_reservations(
+    data: ReservationBatchRequest,
+    db: Session = Depends(get_db),
+    current: User = Depends(require_role(UserRole.OWNER, UserRole.SUPERADMIN)),
+):
+    """
+    Aplica la misma acción (confirm/reject) a varias reservas con las mismas
+    reglas que los endpoints individuales y devuelve el resultado por id.
+    Las reservas que no se pueden procesar no afectan a las demás.
+    """
+    reservation_ids = list(dict.fromkeys(data.reservation_ids))
+    if len(reservation_ids) > MAX_BATCH_RESERVATIONS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BATCH_RESERVATIONS} reservas por petición")
+    confirming = data.action == "confirm"
+
+    room_of = dict(
+        db.query(Reservation.id, Reservation.room_id).filter(Reservation.id.in_(reservation_ids)).all()
+    ) if reservation_ids else {}
+
+    with lock_conflicts_as_409(db, "Las habitaciones están siendo reservadas, intenta nuevamente"):
+        # 🔒 Habitaciones (con su residencia) bloqueadas en orden de id para evitar deadlocks,
+        #    luego las reservas ya con el lock tomado
+        rooms = {
+            room.id: room
+            for room in db.query(Room)
+            .options(joinedload(Room.residence))
+            .filter(Room.id.in_(set(room_of.values())))
+            .order_by(Room.id)
+            .with_for_update(of=Room)
+            .populate_existing()
+        }
+        reservations = {
+            res.id: res
+            for res in db.query(Reservation)
+            .filter(Reservation.id.in_(list(room_of)))
+            .with_for_update()
+            .populate_existing()
+        }
+
+        # Reservas confirmadas que pueden solaparse y detalles ya existentes (una consulta cada una)
+        confirmed_by_room: dict = {}
+        with_details = set()
+        if confirming and reservations:
+            window_start = min(res.start_date for res in reservations.values())
+            window_end = max(res.end_date for res in reservations.values())
+            for r_id, r_room, r_start, r_end in (
+                db.query(Reservation.id, Reservation.room_id, Reservation.start_date, Reservation.end_date)
+                .filter(
+                    Reservation.room_id.in_(list(rooms)),
+                    Reservation.status == ReservationStatus.CONFIRMED,
+                    reservation_overlaps(window_start, window_end),
+                )
+                .with_for_update(read=True)
+            ):
+                confirmed_by_room.setdefault(r_room, []).append((r_id, r_start, r_end))
+            with_details = {
+                r_id
+                for (r_id,) in db.query(ContractDetails.reservation_id)
+                .filter(ContractDetails.reservation_id.in_(list(reservations)))
+            }
+
+        target = ReservationStatus.CONFIRMED if confirming else ReservationStatus.REJECTED
+        results = []
+        deltas: dict = {}
+        drafts = []
+        for reservation_id in reservation_ids:
+            res = reservations.get(reservation_id)
+            room = rooms.get(res.room_id) if res else None
+            if not res:
+                error = "Reserva no encontrada"
+            elif not room:
+                error = "Habitación no encontrada"
+            elif current.role != UserRole.SUPERADMIN and room.residence.owner_id != current.id:
+                error = "No autorizado"
+            elif res.status != ReservationStatus.PENDING:
+                error = NOT_PENDING_DETAIL
+            elif confirming and any(
+                other_id != res.id and other_start < res.end_date and other_end > res.start_date
+                for other_id, other_start, other_end in confirmed_by_room.get(room.id, ())
+            ):
+                error = "Rango de fechas se solapa con otra reserva confirmada"
+            else:
+                error = None
+            if error:
+                results.append(ReservationBatchItemResult(id=reservation_id, ok=False, detail=error))
+                continue
+
+            owner_id = room.residence.owner_id
+            deltas.setdefault(owner_id, []).append(owner_stats.status_change(res.status, target))
+            res.status = target
+
+            if confirming:
+                room_before = owner_stats.room_contribution(room.is_available, room.price_per_month)
+                room.is_available = False
+                deltas[owner_id].append(
+                    owner_stats.room_change(room_before, owner_stats.room_contribution(False, room.price_per_month))
+                )
+                confirmed_by_room.setdefault(room.id, []).append((res.id, res.start_date, res.end_date))
+                if res.id not in with_details:
+                    drafts.append(_contract_draft(res, room))
+                    with_details.add(res.id)
+
+            results.append(ReservationBatchItemResult(id=reservation_id, ok=True, status=target))
+
+        if deltas:
+            # INSERT en lote de los borradores de contrato (insertmanyvalues)
+            if drafts:
+                db.execute(insert(ContractDetails), drafts)
+            db.flush()
+            for owner_id, owner_deltas in deltas.items():
+                owner_stats.record(db, owner_id, *owner_deltas)
+            if confirming:
+                bump_version(db, "rooms")
+            db.commit()
+
+    processed = sum(1 for r in results if r.ok)
+    return ReservationBatchResult(
+        confirmed=processed if confirming else 0,
+        rejected=0 if confirming else processed,
+        failed=len(results) - processed,
+        results=results,
+    )
+
 # --------------------------------------------------------------------
 # 📋 Listar todas las reservas (según permisos)
 # --------------------------------------------------------------------
-@router.get("/", response_model=List[ReservationOut])
+@router.get("/", response_model=ReservationPage)
 def list_reservations(
     db: Session = Depends(get_db),
     current: User = Depends(get_current_user),
     status: Optional[ReservationStatus] = None,
     room_id: Optional[int] = None,
+    residence_id: Optional[int] = None,
+    owner_id: Optional[int] = None,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    end_from: Optional[datetime] = None,
+    end_to: Optional[datetime] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
+    """
+    Lista reservas (más recientes primero) con paginación por cursor.
+
+    1) Se resuelven solo los ids de la página con los filtros (índices sobre
+       reservations/rooms/residences, sin nombres ni direcciones).
+    2) La proyección con owner/student/residencia se ejecuta solo para esos ids.
+    """
+    after = decode_cursor(cursor, 1)
+    if after is not None and not isinstance(after[0], int):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    # Un owner solo ve las reservas de sus residencias (se ignora otro owner_id)
+    if current.role == UserRole.OWNER:
+        owner_id = current.id
+
+    # 1) Ids de la página
+    ids_q = db.query(Reservation.id)
+
+    if status:
+        ids_q = ids_q.filter(Reservation.status == status)
+
+    if room_id:
+        ids_q = ids_q.filter(Reservation.room_id == room_id)
+
+    if residence_id is not None or owner_id is not None:
+        ids_q = ids_q.join(Room, Room.id == Reservation.room_id)
+        if residence_id is not None:
+            ids_q = ids_q.filter(Room.residence_id == residence_id)
+        if owner_id is not None:
+            ids_q = ids_q.join(Residence, Residence.id == Room.residence_id).filter(
+                Residence.owner_id == owner_id
+            )
+
+    # Rangos de fechas (límites inclusivos)
+    if start_from is not None:
+        ids_q = ids_q.filter(Reservation.start_date >= to_naive_utc(start_from))
+    if start_to is not None:
+        ids_q = ids_q.filter(Reservation.start_date <= to_naive_utc(start_to))
+    if end_from is not None:
+        ids_q = ids_q.filter(Reservation.end_date >= to_naive_utc(end_from))
+    if end_to is not None:
+        ids_q = ids_q.filter(Reservation.end_date <= to_naive_utc(end_to))
+
+    if current.role == UserRole.STUDENT:
+        ids_q = ids_q.filter(Reservation.student_id == current.id)
+
+    if after is not None:
+        ids_q = ids_q.filter(Reservation.id < after[0])
+
+    page_ids = [r_id for (r_id,) in ids_q.order_by(Reservation.id.desc()).limit(limit + 1)]
+
+    next_cursor = None
+    if len(page_ids) > limit:
+        page_ids = page_ids[:limit]
+        next_cursor = encode_cursor(page_ids[-1])
+
+    if not page_ids:
+        return model_response(ReservationPage.model_construct(items=[], next_cursor=None))
+
+    # 2) Proyección con nombres solo para las filas de la página
     owner = aliased(User)
     student = aliased(User)
-
-    q = (
+    rows = (
         db.query(
             Reservation.id.label("id"),
             Reservation.room_id.label("room_id"),
@@ -218,25 +490,63 @@ def list_reservations(
             Room.price_per_month.label("room_price"),
         )
         .join(Room, Room.id == Reservation.room_id)
-        .join(Residence, Residence.id == Room.residence_id)
-        .join(owner, owner.id == Residence.owner_id)
-        .join(student, student.id == Reservation.student_id)
+        .outerjoin(Residence, Residence.id == Room.residence_id)
+        .outerjoin(owner, owner.id == Residence.owner_id)
+        .outerjoin(student, student.id == Reservation.student_id)
+        .filter(Reservation.id.in_(page_ids))
+        .order_by(Reservation.id.desc())
+        .all()
     )
 
-    if status:
-        q = q.filter(Reservation.status == status)
-
-    if room_id:
-        q = q.filter(Reservation.room_id == room_id)
+    # 👇 una sola serialización (filas -> bytes JSON), sin revalidar en FastAPI
+    return model_response(
+        ReservationPage.model_construct(items=RESERVATION_OUT_LIST.validate(rows), next_cursor=next_cursor)
+    )
 
-    if current.role == UserRole.STUDENT:
-        q = q.filter(Reservation.student_id == current.id)
+# --------------------------------------------------------------------
+# 📤 Exportar todas las reservas (CSV / NDJSON en streaming)
+# --------------------------------------------------------------------
+RESERVATION_EXPORT_HEADER = (
+    "id", "room_id", "residence_id", "owner_id", "student_id",
+    "start_date", "end_date", "status", "total_price",
+)
 
-    q = q.order_by(Reservation.id.desc())
-    rows = q.all()
 
-    # 👇 aquí el cambio importante
-    return [ReservationOut(**dict(r._mapping)) for r in rows]
+@router.get("/export")
+def export_reservations(
+    fmt: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    owner_id: Optional[int] = None,
+    current: User = Depends(require_role(UserRole.OWNER, UserRole.SUPERADMIN)),
+):
+    """
+    Exporta reservas para contabilidad: SUPERADMIN todas (o las de
+    `owner_id`), un owner solo las de sus residencias. Las filas se leen con
+    un cursor del servidor y se envían a medida que llegan, así la memoria
+    no crece con el tamaño de la tabla.
+    """
+    # Un owner solo exporta las reservas de sus residencias (se ignora otro owner_id)
+    if current.role == UserRole.OWNER:
+        owner_id = current.id
+
+    stmt = (
+        select(
+            Reservation.id,
+            Reservation.room_id,
+            Room.residence_id,
+            Residence.owner_id,
+            Reservation.student_id,
+            Reservation.start_date,
+            Reservation.end_date,
+            Reservation.status,
+            Reservation.total_price,
+        )
+        .outerjoin(Room, Room.id == Reservation.room_id)
+        .outerjoin(Residence, Residence.id == Room.residence_id)
+        .order_by(Reservation.id)
+    )
+    if owner_id is not None:
+        stmt = stmt.where(Residence.owner_id == owner_id)
+    return export_response(stmt, RESERVATION_EXPORT_HEADER, fmt, "reservations")
 
 # --------------------------------------------------------------------
 # 🧑‍🎓 Listar reservas de un estudiante específico (por id)
@@ -310,46 +620,39 @@ def list_reservations_by_owner(
     ]
 # ✅ LISTAR RESERVAS POR OWNER (con datos completos)
 @router.get("/by_owner/{owner_id}", response_model=List[ReservationOut])
-def list_reservations_by_owner(owner_id: int, db: Session = Depends(get_db)):
+def list_reservations_by_owner_detailed(owner_id: int, db: Session = Depends(get_db)):
     """
     Lista todas las reservas asociadas a las residencias del owner.
-    Devuelve datos completos del contrato (propietario, estudiante, residencia, habitación).
+    Devuelve datos completos del contrato (propietario, estudiante, residencia, habitación)
+    en una sola consulta con joins (sin consultas por fila).
     """
+    owner = aliased(User)
+    student = aliased(User)
 
-    reservations = (
-        db.query(Reservation)
+    rows = (
+        db.query(
+            Reservation.id.label("id"),
+            Reservation.room_id.label("room_id"),
+            Reservation.student_id.label("student_id"),
+            Reservation.start_date.label("start_date"),
+            Reservation.end_date.label("end_date"),
+            Reservation.status.label("status"),
+            func.coalesce(Reservation.total_price, 0.0).label("total_price"),
+
+            # ✅ Datos completos para el contrato
+            func.coalesce(owner.full_name, "No disponible").label("owner_name"),
+            func.coalesce(student.full_name, "No disponible").label("student_name"),
+            func.coalesce(Residence.name, "Sin nombre").label("residence_name"),
+            func.coalesce(Residence.address, "Sin dirección").label("residence_address"),
+            func.coalesce(Room.price_per_month, 0.0).label("room_price"),
+        )
         .join(Room, Room.id == Reservation.room_id)
         .join(Residence, Residence.id == Room.residence_id)
-        .join(User, User.id == Residence.owner_id)
-        .options(joinedload(Reservation.room).joinedload(Room.residence))
+        .join(owner, owner.id == Residence.owner_id)
+        .outerjoin(student, student.id == Reservation.student_id)
         .filter(Residence.owner_id == owner_id)
+        .order_by(Reservation.id.desc())
         .all()
     )
 
-    result = []
-    for r in reservations:
-        room = r.room
-        residence = room.residence if room else None
-
-        student = db.query(User).get(r.student_id) if r.student_id else None
-        owner = db.query(User).get(owner_id)
-
-        result.append({
-            "id": r.id,
-            "room_id": r.room_id,
-            "student_id": r.student_id,
-            "start_date": r.start_date.isoformat(),
-            "end_date": r.end_date.isoformat(),
-            "status": r.status,
-            "total_price": getattr(r, "total_price", 0.0),
-
-            # ✅ Datos completos para el contrato
-            "owner_name": owner.full_name if owner else "No disponible",
-            "student_name": student.full_name if student else "No disponible",
-            "residence_name": residence.name if residence else "Sin nombre",
-            "residence_address": residence.address if residence else "Sin dirección",
-            "room_price": room.price_per_month if room else 0.0,
-        })
-
-    return result
-
+    return RESERVATION_OUT_LIST.response(rows)
@@ -1,6 +1,6 @@
 import os
 import uuid
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app.api.deps import get_db, require_role, get_current_user
@@ -8,6 +8,9 @@ from app.models.user import UserRole, User
 from app.models.residence import Residence
 from app.schemas.residence import ResidenceCreate, ResidenceOut, ResidenceUpdate
 from app.core.config import settings
+from app.core.etag import etag_matches, make_etag, not_modified, set_etag
+from app.services.catalog_version import bump_version, get_versions
+from app.services import owner_stats
 
 router = APIRouter()
 MEDIA_ROOT = "media"
@@ -17,12 +20,18 @@ RESIDENCES_MEDIA_ROOT = os.path.join(MEDIA_ROOT, "residences")
 def create_residence(data: ResidenceCreate, db: Session = Depends(get_db), current=Depends(require_role(UserRole.OWNER, UserRole.SUPERADMIN))):
     res = Residence(owner_id=current.id, **data.dict())
     db.add(res)
+    bump_version(db, "residences")
     db.commit()
     db.refresh(res)
     return ResidenceOut(id=res.id, owner_id=res.owner_id, **data.dict())
 
 @router.get("/", response_model=List[ResidenceOut])
-def list_residences(db: Session = Depends(get_db)):
+def list_residences(request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag("residences", get_versions(db, "residences")["residences"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     items = db.query(Residence).all()
     return [ResidenceOut(id=i.id, owner_id=i.owner_id, name=i.name, description=i.description, address=i.address, district=i.district, city=i.city, latitude=i.latitude, longitude=i.longitude) for i in items]
 @router.post("/{residence_id}/image-url", response_model=ResidenceOut)
@@ -67,6 +76,7 @@ async def upload_residence_main_image(
     # 7) Guardar en BD
     residence.main_image = public_url
     db.add(residence)
+    bump_version(db, "residences")
     db.commit()
     db.refresh(residence)
 
@@ -86,9 +96,13 @@ def update_residence(residence_id: int, update_data: ResidenceUpdate, db: Sessio
     if current.role != UserRole.SUPERADMIN and residence.owner_id != current.id:
         raise HTTPException(status_code=403, detail="No autorizado para editar esta residencia")
 
+    previous_owner_id = residence.owner_id
     for field, value in update_data.model_dump(exclude_unset=True).items():
         setattr(residence, field, value)
+    if residence.owner_id != previous_owner_id:
+        owner_stats.recompute_many(db, [previous_owner_id, residence.owner_id])
 
+    bump_version(db, "residences")
     db.commit()
     db.refresh(residence)
     return residence
@@ -104,6 +118,8 @@ def delete_residence(residence_id: int, db: Session = Depends(get_db), current=D
         raise HTTPException(status_code=403, detail="No autorizado para eliminar esta residencia")
 
     db.delete(residence)
+    owner_stats.recompute(db, residence.owner_id)
+    bump_version(db, "residences", "rooms")
     db.commit()
     return {"detail": "Residencia eliminada correctamente"}
 # 🔹 Nuevo endpoint: listar residencias por propietario (owner)
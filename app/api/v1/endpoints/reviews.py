@@ -5,8 +5,10 @@ from app.api.deps import get_db, require_role
 from app.models.user import UserRole, User
 from app.models.review import Review
 from app.schemas.review import ReviewCreate, ReviewOut
+from app.core.responses import ListSerializer
 
 router = APIRouter()
+REVIEW_OUT_LIST = ListSerializer(ReviewOut)
 
 @router.post("/", response_model=ReviewOut)
 def create_review(data: ReviewCreate, db: Session = Depends(get_db), current: User = Depends(require_role(UserRole.STUDENT, UserRole.SUPERADMIN))):
@@ -24,10 +26,9 @@ def create_review(data: ReviewCreate, db: Session = Depends(get_db), current: Us
 
 @router.get("/", response_model=List[ReviewOut])
 def list_reviews(db: Session = Depends(get_db), room_id: int | None = None, residence_id: int | None = None):
-    q = db.query(Review)
+    q = db.query(Review.id, Review.user_id, Review.rating, Review.comment, Review.room_id, Review.residence_id)
     if room_id:
         q = q.filter(Review.room_id == room_id)
     if residence_id:
         q = q.filter(Review.residence_id == residence_id)
-    items = q.order_by(Review.id.desc()).all()
-    return [ReviewOut(id=i.id, user_id=i.user_id, rating=i.rating, comment=i.comment, room_id=i.room_id, residence_id=i.residence_id) for i in items]
+    return REVIEW_OUT_LIST.response(q.order_by(Review.id.desc()).all())
@@ -1,19 +1,89 @@
 import os
 import uuid
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException,Query
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Optional
+from sqlalchemy import Integer, cast, func, or_, update
+from typing import Dict, List, Optional
 from app.api.deps import get_db, require_role, get_current_user
 from app.models.user import UserRole
 from app.models.room import Room, RoomType
 from app.models.residence import Residence
-from app.schemas.room import RoomCreate, RoomOut, RoomUpdate
+from app.models.reservation import Reservation, ReservationStatus
+from app.schemas.room import (
+    FacetCount,
+    DateInterval,
+    PriceBucket,
+    RoomAvailability,
+    RoomBulkItemResult,
+    RoomBulkRequest,
+    RoomBulkResult,
+    RoomCreate,
+    RoomFacets,
+    RoomNearbyOut,
+    RoomOut,
+    RoomPage,
+    RoomUpdate,
+)
 from app.core.config import settings
+from app.core.text import like_prefix
+from app.core.geo import bounding_box, covering_prefixes, haversine_km
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor
+from app.core.responses import model_response
+from app.core.etag import etag_matches, make_etag, not_modified, query_key, set_etag
+from app.services.room_index import room_index
+from app.services.room_search import apply_room_filters, search_rooms
+from app.services.catalog_version import bump_version, get_versions
+from app.services import owner_stats
+from app.services.room_lock import lock_conflicts_as_409, lock_room
+from app.services.availability import availability_by_room, reservation_overlaps, to_naive_utc
 
 router = APIRouter()
 MEDIA_ROOT = "media"
 ROOMS_MEDIA_ROOT = os.path.join(MEDIA_ROOT, "rooms")
+MAX_NEARBY_RADIUS_KM = 50.0
+MAX_BULK_ROOMS = 500
+# Histograma de precios de /public/facets: tramo mínimo (un tramo más fino
+# desborda el número de tramo en la BD) y máximo de tramos en la respuesta
+MIN_PRICE_STEP = 1.0
+MAX_PRICE_BUCKETS = 200
+MAX_AVAILABILITY_ROOMS = 200
+MAX_AVAILABILITY_WINDOW = timedelta(days=366)
+# Columnas NOT NULL de rooms: en un update en lote no se aceptan a null
+NON_NULLABLE_ROOM_FIELDS = ("title", "price_per_month", "capacity", "type")
+
+
+def _decode_room_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Devuelve el último Room.id de la página anterior (o None)."""
+    after = decode_cursor(cursor, 1)
+    if after is None:
+        return None
+    if not isinstance(after[0], int):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return after[0]
+
+
+def _search_rooms(
+    db: Session,
+    limit: int,
+    cursor: Optional[str],
+    versions: Optional[Dict[str, int]] = None,
+    **filters,
+) -> Response:
+    """
+    Búsqueda paginada de habitaciones: desde el índice en memoria si está
+    habilitado, o desde la BD (consulta compilada y cacheada) si no.
+    `versions` (rooms/residences, ya leídas para el ETag) fijan la foto del índice.
+    La página se serializa una sola vez a bytes JSON.
+    """
+    after_id = _decode_room_cursor(cursor)
+    if settings.ROOM_INDEX_ENABLED:
+        items, next_cursor = room_index.search(db, limit=limit, after_id=after_id, versions=versions, **filters)
+    else:
+        items, next_cursor = search_rooms(db, limit=limit, after_id=after_id, **filters)
+    return model_response(RoomPage.model_construct(items=items, next_cursor=next_cursor))
+
+
 # ✅ Crear habitación
 @router.post("/", response_model=RoomOut)
 def create_room(
@@ -23,12 +93,99 @@ def create_room(
 ):
     room = Room(**data.dict())
     db.add(room)
+    owner_stats.record(
+        db,
+        owner_stats.owner_of_residence(db, room.residence_id),
+        owner_stats.room_contribution(room.is_available, room.price_per_month),
+    )
+    bump_version(db, "rooms")
     db.commit()
     db.refresh(room)
     return RoomOut.model_validate(room, from_attributes=True)
 
+# 📦 Crear/actualizar habitaciones en lote (una transacción)
+@router.post("/bulk", response_model=RoomBulkResult)
+def bulk_upsert_rooms(
+    data: RoomBulkRequest,
+    db: Session = Depends(get_db),
+    current=Depends(require_role(UserRole.OWNER, UserRole.SUPERADMIN)),
+):
+    if len(data.create) + len(data.update) > MAX_BULK_ROOMS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BULK_ROOMS} habitaciones por petición")
+
+    # 🔎 Resolver habitaciones y dueños de residencias con dos consultas en total
+    room_residence = dict(
+        db.query(Room.id, Room.residence_id)
+        .filter(Room.id.in_({item.id for item in data.update}))
+        .all()
+    ) if data.update else {}
+    residence_ids = {item.residence_id for item in data.create} | set(room_residence.values())
+    residence_owner = dict(
+        db.query(Residence.id, Residence.owner_id)
+        .filter(Residence.id.in_(residence_ids))
+        .all()
+    ) if residence_ids else {}
+
+    def check_residence(residence_id):
+        if residence_id not in residence_owner:
+            return "Residencia no encontrada"
+        if current.role != UserRole.SUPERADMIN and residence_owner[residence_id] != current.id:
+            return "No autorizado para esta residencia"
+        return None
+
+    results = []
+    new_rooms = []
+    for index, item in enumerate(data.create):
+        error = check_residence(item.residence_id)
+        if error:
+            results.append(RoomBulkItemResult(operation="create", index=index, ok=False, detail=error))
+            continue
+        room = Room(**item.model_dump())
+        new_rooms.append(room)
+        results.append(RoomBulkItemResult(operation="create", index=index, ok=True))
+
+    updates = []
+    for index, item in enumerate(data.update):
+        if item.id not in room_residence:
+            error = "Habitación no encontrada"
+        else:
+            error = check_residence(room_residence[item.id])
+        fields = item.model_dump(exclude_unset=True)
+        if not error and len(fields) == 1:
+            error = "Sin campos para actualizar"
+        if not error:
+            nulls = [name for name in NON_NULLABLE_ROOM_FIELDS if name in fields and fields[name] is None]
+            if nulls:
+                error = f"No pueden ser nulos: {', '.join(nulls)}"
+        results.append(RoomBulkItemResult(operation="update", index=index, ok=not error, id=item.id, detail=error))
+        if not error:
+            updates.append(fields)
+
+    if new_rooms or updates:
+        # INSERT en lote (insertmanyvalues) y UPDATE por clave primaria en lote (executemany)
+        db.add_all(new_rooms)
+        db.flush()
+        created_ids = iter([room.id for room in new_rooms])
+        if updates:
+            db.execute(update(Room), updates)
+        owner_stats.recompute_many(db, (residence_owner[r.residence_id] for r in new_rooms))
+        owner_stats.recompute_many(db, (residence_owner[room_residence[u["id"]]] for u in updates))
+        bump_version(db, "rooms")
+        db.commit()
+
+        for result in results:
+            if result.operation == "create" and result.ok:
+                result.id = next(created_ids)
+
+    return RoomBulkResult(
+        created=len(new_rooms),
+        updated=len(updates),
+        failed=sum(1 for r in results if not r.ok),
+        results=results,
+    )
+
 # ✅ Listar habitaciones (con filtros + control por rol)
-@router.get("/", response_model=List[RoomOut])
+@router.get("/", response_model=RoomPage)
 def list_rooms(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
@@ -38,62 +195,29 @@ def list_rooms(
     max_price: Optional[float] = None,
     capacity: Optional[int] = None,
     room_type: Optional[RoomType] = Query(default=None, alias="type"),  # alias "type"
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
-    q = db.query(Room)
-
-    # Filtro por residencia
-    if residence_id is not None:
-        q = q.filter(Room.residence_id == residence_id)
-
-    # Filtro por ciudad o distrito
-    if city:
-        q = q.join(Room.residence).filter(
-            or_(
-                Residence.city.ilike(f"%{city}%"),
-                Residence.district.ilike(f"%{city}%"),
-            )
-        )
-
-    # Filtros adicionales
-    if min_price is not None:
-        q = q.filter(Room.price_per_month >= min_price)
-    if max_price is not None:
-        q = q.filter(Room.price_per_month <= max_price)
-    if room_type is not None:
-        q = q.filter(Room.type == room_type)
-    if capacity is not None:
-        q = q.filter(Room.capacity >= capacity)
-
     # 🔒 Regla de visibilidad por rol:
     # - STUDENT: solo ve habitaciones disponibles
     # - OWNER / SUPERADMIN: ven todas
-    if current_user.role == UserRole.STUDENT:
-        q = q.filter(Room.is_available.is_(True))
-
-    rooms = q.all()
-
-    result = []
-    for r in rooms:
-        result.append(
-            RoomOut(
-                id=r.id,
-                residence_id=r.residence_id,
-                title=r.title,
-                description=r.description,
-                image_url=getattr(r, "image_url", None),
-                type=getattr(r, "type", RoomType.HABITACION),
-                capacity=getattr(r, "capacity", 1),
-                price_per_month=r.price_per_month,
-                has_private_bath=getattr(r, "has_private_bath", False),
-                is_available=getattr(r, "is_available", True),
-            )
-        )
-
-    return result
+    return _search_rooms(
+        db,
+        limit,
+        cursor,
+        residence_id=residence_id,
+        city=city,
+        min_price=min_price,
+        max_price=max_price,
+        capacity=capacity,
+        room_type=room_type,
+        only_available=current_user.role == UserRole.STUDENT,
+    )
 
 # 🌐 Endpoint público: solo habitaciones disponibles, sin autenticación
-@router.get("/public", response_model=List[RoomOut])
+@router.get("/public", response_model=RoomPage)
 def list_public_rooms(
+    request: Request,
     db: Session = Depends(get_db),
     residence_id: Optional[int] = None,
     city: Optional[str] = None,
@@ -101,55 +225,230 @@ def list_public_rooms(
     max_price: Optional[float] = None,
     capacity: Optional[int] = None,
     room_type: Optional[RoomType] = Query(default=None, alias="type"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
-    q = db.query(Room)
+    # 🏷️ ETag: versión de rooms/residences + parámetros (sin tocar las tablas grandes)
+    versions = get_versions(db, "rooms", "residences")
+    etag = make_etag("rooms/public", versions["rooms"], versions["residences"], query_key(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # Público => siempre solo habitaciones disponibles
+    page = _search_rooms(
+        db,
+        limit,
+        cursor,
+        versions,
+        residence_id=residence_id,
+        city=city,
+        min_price=min_price,
+        max_price=max_price,
+        capacity=capacity,
+        room_type=room_type,
+        only_available=True,
+    )
+    set_etag(page, etag)
+    return page
+
+# 📊 Endpoint público: facetas de búsqueda con los mismos filtros que /public
+@router.get("/public/facets", response_model=RoomFacets)
+def public_room_facets(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    residence_id: Optional[int] = None,
+    city: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    capacity: Optional[int] = None,
+    room_type: Optional[RoomType] = Query(default=None, alias="type"),
+    price_step: float = Query(default=100.0, ge=MIN_PRICE_STEP),
+):
+    versions = get_versions(db, "rooms", "residences")
+    etag = make_etag("rooms/facets", versions["rooms"], versions["residences"], query_key(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    # Una sola consulta agrupada por tipo, ciudad normalizada, baño y tramo de
+    # precio (calculado en la BD): las filas devueltas son pocas aunque haya
+    # muchos precios distintos. La ciudad se muestra con una de sus grafías.
+    bucket = cast(func.floor(Room.price_per_month / price_step), Integer)
+    q = (
+        db.query(
+            Room.type,
+            Residence.city_search,
+            func.min(Residence.city),
+            Room.has_private_bath,
+            bucket,
+            func.count(Room.id),
+            func.min(Room.price_per_month),
+            func.max(Room.price_per_month),
+        )
+        .outerjoin(Residence, Residence.id == Room.residence_id)
+        .filter(Room.is_available.is_(True))
+    )
+    q = apply_room_filters(
+        q, residence_id, city, min_price, max_price, capacity, room_type, residence_joined=True
+    )
+    rows = q.group_by(Room.type, Residence.city_search, Room.has_private_bath, bucket).all()
+
+    if len({row[4] for row in rows}) > MAX_PRICE_BUCKETS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"price_step demasiado pequeño: el histograma supera {MAX_PRICE_BUCKETS} tramos",
+        )
+
+    total = 0
+    types: dict = {}
+    cities: dict = {}
+    city_labels: dict = {}
+    with_bath = 0
+    buckets: dict = {}
+    low_prices = []
+    high_prices = []
+    for r_type, r_city_key, r_city, r_bath, r_bucket, count, r_min, r_max in rows:
+        total += count
+        type_key = (r_type or RoomType.HABITACION).value
+        types[type_key] = types.get(type_key, 0) + count
+        if r_city_key:
+            cities[r_city_key] = cities.get(r_city_key, 0) + count
+            city_labels[r_city_key] = min(city_labels.get(r_city_key, r_city), r_city)
+        if r_bath:
+            with_bath += count
+        buckets[r_bucket] = buckets.get(r_bucket, 0) + count
+        low_prices.append(r_min)
+        high_prices.append(r_max)
+
+    return RoomFacets(
+        total=total,
+        types=[FacetCount(value=k, count=v) for k, v in sorted(types.items(), key=lambda kv: -kv[1])],
+        cities=[
+            FacetCount(value=city_labels[k], count=v) for k, v in sorted(cities.items(), key=lambda kv: -kv[1])
+        ],
+        with_private_bath=with_bath,
+        without_private_bath=total - with_bath,
+        min_price=min(low_prices) if low_prices else None,
+        max_price=max(high_prices) if high_prices else None,
+        price_histogram=[
+            PriceBucket(min_price=b * price_step, max_price=(b + 1) * price_step, count=c)
+            for b, c in sorted(buckets.items())
+        ],
+    )
 
-    # Filtro por residencia
+
+# 📅 Calendario de disponibilidad (intervalos libres/ocupados) de una o varias habitaciones
+@router.get("/availability", response_model=List[RoomAvailability])
+def rooms_availability(
+    start: datetime,
+    end: datetime,
+    room_ids: List[int] = Query(default=[]),
+    residence_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="La fecha de fin debe ser mayor que la fecha de inicio")
+    if end - start > MAX_AVAILABILITY_WINDOW:
+        raise HTTPException(status_code=400, detail="La ventana máxima es de un año")
+
+    ids = list(dict.fromkeys(room_ids))
     if residence_id is not None:
-        q = q.filter(Room.residence_id == residence_id)
-
-    # Filtro por ciudad o distrito
-    if city:
-        q = q.join(Room.residence).filter(
-            or_(
-                Residence.city.ilike(f"%{city}%"),
-                Residence.district.ilike(f"%{city}%"),
-            )
+        ids += [
+            room_id
+            for (room_id,) in db.query(Room.id).filter(Room.residence_id == residence_id).order_by(Room.id)
+            if room_id not in ids
+        ]
+    if not ids:
+        raise HTTPException(status_code=400, detail="Debe indicar room_ids o residence_id")
+    if len(ids) > MAX_AVAILABILITY_ROOMS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_AVAILABILITY_ROOMS} habitaciones por consulta")
+
+    # Una sola consulta para todas las habitaciones (reservas confirmadas que tocan la ventana)
+    rows = (
+        db.query(Reservation.room_id, Reservation.start_date, Reservation.end_date)
+        .filter(
+            Reservation.room_id.in_(ids),
+            Reservation.status == ReservationStatus.CONFIRMED,
+            reservation_overlaps(start, end),
         )
+        .all()
+    )
 
-    # Filtros adicionales
-    if min_price is not None:
-        q = q.filter(Room.price_per_month >= min_price)
-    if max_price is not None:
-        q = q.filter(Room.price_per_month <= max_price)
-    if room_type is not None:
-        q = q.filter(Room.type == room_type)
-    if capacity is not None:
-        q = q.filter(Room.capacity >= capacity)
+    calendar = availability_by_room(rows, ids, start, end)
+    return [
+        RoomAvailability(
+            room_id=room_id,
+            busy=[DateInterval(start=b_start, end=b_end) for b_start, b_end in busy],
+            free=[DateInterval(start=f_start, end=f_end) for f_start, f_end in free],
+        )
+        for room_id, (busy, free) in calendar.items()
+    ]
 
-    # Público => siempre solo habitaciones disponibles
-    q = q.filter(Room.is_available.is_(True))
-
-    rooms = q.all()
-
-    result = []
-    for r in rooms:
-        result.append(
-            RoomOut(
-                id=r.id,
-                residence_id=r.residence_id,
-                title=r.title,
-                description=r.description,
-                image_url=getattr(r, "image_url", None),
-                type=getattr(r, "type", RoomType.HABITACION),
-                capacity=getattr(r, "capacity", 1),
-                price_per_month=r.price_per_month,
-                has_private_bath=getattr(r, "has_private_bath", False),
-                is_available=getattr(r, "is_available", True),
-            )
+
+# 📍 Endpoint público: habitaciones disponibles cerca de un punto, ordenadas por distancia
+@router.get("/nearby", response_model=List[RoomNearbyOut])
+def list_nearby_rooms(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(default=3.0, gt=0, le=MAX_NEARBY_RADIUS_KM),
+    db: Session = Depends(get_db),
+    residence_id: Optional[int] = None,
+    city: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    capacity: Optional[int] = None,
+    room_type: Optional[RoomType] = Query(default=None, alias="type"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    # 1) Prefiltro con índice: celdas geohash que cubren el radio + bounding box
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    q = (
+        db.query(Room, Residence.latitude, Residence.longitude)
+        .join(Residence, Residence.id == Room.residence_id)
+        .filter(
+            or_(*[
+                Residence.geohash.like(like_prefix(prefix), escape="\\")
+                for prefix in covering_prefixes(lat, lng, radius_km)
+            ]),
+            Residence.latitude.between(min_lat, max_lat),
+            Room.is_available.is_(True),
+        )
+    )
+    # Si la caja cruza el antimeridiano basta con el filtro por geohash
+    if -180.0 <= min_lng and max_lng <= 180.0:
+        q = q.filter(Residence.longitude.between(min_lng, max_lng))
+
+    q = apply_room_filters(
+        q, residence_id, city, min_price, max_price, capacity, room_type, residence_joined=True
+    )
+
+    # 2) Filtro exacto (haversine) y orden por distancia
+    candidates = []
+    for r, r_lat, r_lng in q.all():
+        distance = haversine_km(lat, lng, r_lat, r_lng)
+        if distance <= radius_km:
+            candidates.append((distance, r.id, r))
+    candidates.sort(key=lambda c: (c[0], c[1]))
+
+    return [
+        RoomNearbyOut(
+            id=r.id,
+            residence_id=r.residence_id,
+            title=r.title,
+            description=r.description,
+            image_url=getattr(r, "image_url", None),
+            type=getattr(r, "type", RoomType.HABITACION),
+            capacity=getattr(r, "capacity", 1),
+            price_per_month=r.price_per_month,
+            has_private_bath=getattr(r, "has_private_bath", False),
+            is_available=getattr(r, "is_available", True),
+            distance_km=round(distance, 3),
         )
+        for distance, _, r in candidates[:limit]
+    ]
 
-    return result
 @router.post("/{room_id}/image-url", response_model=RoomOut)
 async def upload_room_main_image(
     room_id: int,
@@ -185,6 +484,7 @@ async def upload_room_main_image(
 
     room.main_image = public_url
     db.add(room)
+    bump_version(db, "rooms")
     db.commit()
     db.refresh(room)
 
@@ -192,11 +492,17 @@ async def upload_room_main_image(
 
 # ✅ Obtener habitación por ID
 @router.get("/{room_id}", response_model=RoomOut)
-def get_room(room_id: int, db: Session = Depends(get_db)):
+def get_room(room_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    # Primero la existencia: If-None-Match: * no debe dar 304 para un id inexistente
     room = db.query(Room).get(room_id)
     if not room:
         raise HTTPException(status_code=404, detail="No encontrado")
 
+    etag = make_etag("rooms", room_id, get_versions(db, "rooms")["rooms"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    set_etag(response, etag)
     return RoomOut(
         id=room.id,
         residence_id=room.residence_id,
@@ -218,18 +524,28 @@ def update_room(
     db: Session = Depends(get_db),
     current=Depends(get_current_user)
 ):
-    room = db.query(Room).get(room_id)
-    if not room:
-        raise HTTPException(status_code=404, detail="Habitación no encontrada")
-
-    if current.role != UserRole.SUPERADMIN and room.residence.owner_id != current.id:
-        raise HTTPException(status_code=403, detail="No autorizado para editar esta habitación")
-
-    for field, value in update_data.model_dump(exclude_unset=True).items():
-        setattr(room, field, value)
+    # 🔒 Lock de la habitación: `before` no puede quedar desfasado por una
+    #    confirmación concurrente (el delta de owner_stats sería incorrecto)
+    with lock_conflicts_as_409(db):
+        room = lock_room(db, room_id)
+        if not room:
+            raise HTTPException(status_code=404, detail="Habitación no encontrada")
+
+        if current.role != UserRole.SUPERADMIN and room.residence.owner_id != current.id:
+            raise HTTPException(status_code=403, detail="No autorizado para editar esta habitación")
+
+        before = owner_stats.room_contribution(room.is_available, room.price_per_month)
+        for field, value in update_data.model_dump(exclude_unset=True).items():
+            setattr(room, field, value)
+        owner_stats.record(
+            db,
+            room.residence.owner_id,
+            owner_stats.room_change(before, owner_stats.room_contribution(room.is_available, room.price_per_month)),
+        )
 
-    db.commit()
-    db.refresh(room)
+        bump_version(db, "rooms")
+        db.commit()
+        db.refresh(room)
     return RoomOut.model_validate(room, from_attributes=True)
 
 # ✅ Eliminar habitación
@@ -246,6 +562,9 @@ def delete_room(
     if current.role != UserRole.SUPERADMIN and room.residence.owner_id != current.id:
         raise HTTPException(status_code=403, detail="No autorizado para eliminar esta habitación")
 
+    owner_id = room.residence.owner_id
     db.delete(room)
+    owner_stats.recompute(db, owner_id)
+    bump_version(db, "rooms")
     db.commit()
     return {"detail": "Habitación eliminada correctamente"}
\ No newline at end of file
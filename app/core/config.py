@@ -40,6 +40,18 @@ class Settings(BaseSettings):
     # ----------------------------------
     ALLOWED_ORIGINS: List[str] = ["*"]
 
+    # ----------------------------------
+    # 🔎 Índice de búsqueda de habitaciones (en memoria)
+    # ----------------------------------
+    ROOM_INDEX_ENABLED: bool = True
+
+    # ----------------------------------
+    # 🗓️ Ciclo de vida de reservas (tarea en segundo plano)
+    # ----------------------------------
+    LIFECYCLE_ENABLED: bool = True
+    LIFECYCLE_INTERVAL_SECONDS: int = 3600
+    LIFECYCLE_BATCH_SIZE: int = 500
+
     class Config:
         env_file = Path(__file__).resolve().parent.parent.parent / ".env"
 
@@ -0,0 +1,38 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+# Los clientes pueden guardar la respuesta pero deben revalidarla siempre
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag fuerte a partir de las partes que determinan la respuesta."""
+    raw = "|".join(str(p) for p in parts).encode()
+    return '"' + hashlib.sha256(raw).hexdigest()[:32] + '"'
+
+
+def query_key(request: Request) -> str:
+    """Parámetros de la query en forma canónica (el orden no importa)."""
+    return "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True si el cliente ya tiene esta versión (If-None-Match)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
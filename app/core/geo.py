@@ -0,0 +1,83 @@
+import math
+from typing import List, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Codifica una coordenada como geohash de `precision` caracteres."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch <<= 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def _cell_size_deg(precision: int) -> Tuple[float, float]:
+    """(alto, ancho) en grados de una celda geohash de `precision` caracteres."""
+    bits = 5 * precision
+    lat_bits = bits // 2
+    lng_bits = bits - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia ortodrómica en km entre dos coordenadas."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lng, max_lng) que contiene el círculo de radio `radius_km`."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def covering_prefixes(lat: float, lng: float, radius_km: float) -> List[str]:
+    """
+    Prefijos geohash (celda central + 8 vecinas) que cubren el círculo.
+    Se elige la mayor precisión cuya celda mide al menos `radius_km`
+    de alto y de ancho, así las 9 celdas siempre contienen el círculo.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    need_h = max_lat - lat
+    need_w = max_lng - lng
+
+    precision = 1
+    for p in range(GEOHASH_PRECISION, 0, -1):
+        cell_h, cell_w = _cell_size_deg(p)
+        if cell_h >= need_h and cell_w >= need_w:
+            precision = p
+            break
+
+    cell_h, cell_w = _cell_size_deg(precision)
+    prefixes = []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            n_lat = min(max(lat + dy * cell_h, -90.0), 90.0 - 1e-9)
+            n_lng = (lng + dx * cell_w + 180.0) % 360.0 - 180.0
+            prefix = geohash_encode(n_lat, n_lng, precision)
+            if prefix not in prefixes:
+                prefixes.append(prefix)
+    return prefixes
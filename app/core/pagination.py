@@ -0,0 +1,35 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+
+# Tamaño de página por defecto y máximo para los listados paginados
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Codifica la clave de orden de la última fila de una página
+    en un cursor opaco (base64 url-safe de un array JSON).
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """
+    Decodifica un cursor generado por `encode_cursor`.
+    Devuelve None si no hay cursor y lanza 400 si está mal formado.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
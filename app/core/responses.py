@@ -0,0 +1,34 @@
+from typing import Any, Iterable, List, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+class JSONBytesResponse(Response):
+    """Respuesta JSON cuyo cuerpo ya viene serializado en bytes."""
+    media_type = "application/json"
+
+
+def model_response(model: BaseModel) -> JSONBytesResponse:
+    """Serializa un schema ya construido directamente a bytes JSON."""
+    return JSONBytesResponse(model.model_dump_json())
+
+
+class ListSerializer:
+    """
+    TypeAdapter precompilado para List[schema].
+
+    Convierte filas (instancias ORM o Row de SQLAlchemy) y las serializa
+    a bytes JSON dentro de pydantic-core. Al devolver la Response
+    directamente, FastAPI no vuelve a validar ni a serializar la lista
+    del `response_model` (que se mantiene solo para la documentación).
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.adapter = TypeAdapter(List[schema])
+
+    def validate(self, rows: Iterable[Any]) -> list:
+        return self.adapter.validate_python(rows, from_attributes=True)
+
+    def response(self, rows: Iterable[Any]) -> JSONBytesResponse:
+        return JSONBytesResponse(self.adapter.dump_json(self.validate(rows)))
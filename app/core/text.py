@@ -0,0 +1,40 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+# Longitud máxima de un término del índice de búsqueda (columna token)
+MAX_TOKEN_LENGTH = 64
+_WORD = re.compile(r"\w+")
+
+
+def fold_text(value: Optional[str]) -> Optional[str]:
+    """
+    Normaliza un texto para búsquedas: sin tildes, en minúsculas y sin
+    espacios sobrantes ("  Cúsco " -> "cusco").
+    """
+    if value is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+
+def like_prefix(value: str) -> str:
+    """Patrón LIKE 'valor%' escapando los comodines (se usa con escape='\\\\')."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """
+    Términos únicos (normalizados con fold_text) de un texto, en orden de
+    aparición. Se descartan los de un solo carácter.
+    """
+    if not value:
+        return []
+    tokens = []
+    for word in _WORD.findall(fold_text(value)):
+        token = word[:MAX_TOKEN_LENGTH]
+        if len(token) > 1 and token not in tokens:
+            tokens.append(token)
+    return tokens
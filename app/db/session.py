@@ -8,5 +8,7 @@ Base = declarative_base()
 
 def init_db():
     print("🚀 Iniciando aplicación...BS")
-    from app.models import user, profile, residence, room, reservation, review, favorite, media, chat, notification
+    from app.models import user, profile, residence, room, reservation, review, favorite, media, chat, notification, catalog_version, owner_stats
+    # Solo crea tablas que no existen; los cambios sobre tablas existentes
+    # (columnas, índices, rellenos) van en Alembic: `alembic upgrade head`
     Base.metadata.create_all(bind=engine)
@@ -1,5 +1,6 @@
 import os
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,6 +9,7 @@ from fastapi.openapi.utils import get_openapi
 from pathlib import Path
 from app.core.config import settings
 from app.db.session import init_db
+from app.services.lifecycle import lifecycle_scheduler
 from app.api.v1.endpoints import (
     auth,
     users,
@@ -20,6 +22,7 @@ from app.api.v1.endpoints import (
     contracts,
     contract_details,
     chat,
+    dashboard,
 )
 
 
@@ -34,10 +37,19 @@ async def lifespan(app: FastAPI):
     if not os.path.exists("media"):
         os.makedirs("media")
 
+    # 🔹 Tarea periódica: completar reservas vencidas y liberar habitaciones
+    lifecycle_task = None
+    if settings.LIFECYCLE_ENABLED:
+        lifecycle_task = asyncio.create_task(lifecycle_scheduler())
+
     yield  # Aquí la app se ejecuta normalmente
 
     # 🔹 Evento de apagado (antes: @app.on_event("shutdown"))
     print("🛑 Apagando aplicación...")
+    if lifecycle_task is not None:
+        lifecycle_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await lifecycle_task
 
 
 # --- Inicialización principal ---
@@ -124,6 +136,7 @@ app.include_router(
     tags=["Contract_details"],
 )
 app.include_router(chat.router, prefix="/api/v1/chat", tags=["chat"])
+app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["dashboard"])
 
 
 # --- Punto de entrada ---
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from app.db.session import Base
+
+class CatalogVersion(Base):
+    """Contador de versión por tabla del catálogo (para ETags)."""
+    __tablename__ = "catalog_versions"
+
+    table_name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
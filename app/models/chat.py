@@ -1,5 +1,7 @@
 # app/models/chat.py (o donde tengas Conversation/Message)
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, func
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Text, Index, func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -10,8 +12,38 @@ class Conversation(Base):
     student_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, server_default=func.now())
 
+    # 📨 Resumen del último mensaje (se actualiza en send_message).
+    # Sin mensajes, last_message_at es la fecha de creación: así la bandeja
+    # siempre tiene una clave de orden. Se asigna desde Python (no func.now()):
+    # es la clave del cursor de la bandeja y debe guardarse con el mismo
+    # formato que el valor que vuelve en el cursor (SQLite compara texto).
+    # last_message_id decide qué mensaje queda en el resumen: los ids crecen
+    # siempre, las fechas no (Message.created_at la pone el servidor, con otra
+    # precisión y otro reloj que last_message_at)
+    last_message = Column(Text, nullable=True)
+    last_message_id = Column(Integer, nullable=True)
+    last_message_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    last_sender_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    # 👀 Lectura por participante: último mensaje leído y contador de no leídos
+    # (se mantienen en send_message y al marcar como leído; leerlos es O(1))
+    owner_last_read_message_id = Column(Integer, nullable=True)
+    student_last_read_message_id = Column(Integer, nullable=True)
+    owner_unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+    student_unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # 🔎 Una conversación por par owner/student (búsqueda e insert-or-fetch) y
+    #    bandeja de entrada ordenada por último mensaje (paginación por cursor)
+    __table_args__ = (
+        Index("uq_conversations_owner_student", "owner_id", "student_id", unique=True),
+        Index("ix_conversations_owner_last_message", "owner_id", "last_message_at", "id"),
+        Index("ix_conversations_student_last_message", "student_id", "last_message_at", "id"),
+        Index("ix_conversations_last_message", "last_message_at", "id"),
+    )
+
     owner = relationship("User", foreign_keys=[owner_id])
     student = relationship("User", foreign_keys=[student_id])
+    last_sender = relationship("User", foreign_keys=[last_sender_id])
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
 
 
@@ -23,5 +55,32 @@ class Message(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
+    # 🔎 Historial paginado por id dentro de cada conversación
+    __table_args__ = (
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
+
     conversation = relationship("Conversation", back_populates="messages")
     sender = relationship("User", foreign_keys=[sender_id])
+
+
+class MessageToken(Base):
+    """
+    Índice invertido para la búsqueda de mensajes: un término (fold_text)
+    por fila. Se llena en send_message; conversation_id está copiado para
+    filtrar por conversaciones sin pasar por messages.
+    """
+    __tablename__ = "message_tokens"
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"), primary_key=True)
+    token = Column(String(64), primary_key=True)
+    conversation_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_message_tokens_token_conversation",
+            "token",
+            "conversation_id",
+            "message_id",
+            postgresql_ops={"token": "varchar_pattern_ops"},
+        ),
+    )
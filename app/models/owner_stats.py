@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, func
+from app.db.session import Base
+
+class OwnerStats(Base):
+    """Resumen del dashboard por propietario, mantenido en cada escritura."""
+    __tablename__ = "owner_stats"
+
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    # Reservas por estado
+    pending = Column(Integer, nullable=False, default=0)
+    confirmed = Column(Integer, nullable=False, default=0)
+    cancelled = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+    # Habitaciones
+    rooms_total = Column(Integer, nullable=False, default=0)
+    rooms_available = Column(Integer, nullable=False, default=0)
+
+    # Suma de price_per_month de las habitaciones ocupadas (no disponibles)
+    expected_monthly_revenue = Column(Float, nullable=False, default=0.0)
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, Enum, ForeignKey, Float
+from sqlalchemy import Column, Integer, DateTime, Enum, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 from datetime import datetime
@@ -23,6 +23,16 @@ class Reservation(Base):
     status = Column(Enum(ReservationStatus), default=ReservationStatus.PENDING)
     total_price = Column(Float, default=0.0)
 
+    # 🔎 Índices: solapamiento (room_id, status, fechas), ciclo de vida
+    # (status, end_date) y listados paginados por id con filtros
+    __table_args__ = (
+        Index("ix_reservations_room_status_dates", "room_id", "status", "start_date", "end_date"),
+        Index("ix_reservations_status_end_date", "status", "end_date"),
+        Index("ix_reservations_student_id_id", "student_id", "id"),
+        Index("ix_reservations_start_date", "start_date"),
+        Index("ix_reservations_end_date", "end_date"),
+    )
+
     # ✅ Relaciones
     room = relationship("Room", back_populates="reservations")
     student = relationship("User", foreign_keys=[student_id])
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, Index, func
+from sqlalchemy.orm import relationship, validates
 from app.db.session import Base
+from app.core.text import fold_text
+from app.core.geo import geohash_encode
 
 class Residence(Base):
     __tablename__ = "residences"
@@ -17,6 +19,32 @@ class Residence(Base):
     longitude = Column(Float)
     created_at = Column(DateTime, server_default=func.now())
 
+    # 🔎 Ciudad/distrito normalizados (sin tildes, minúsculas) para búsquedas por prefijo
+    city_search = Column(String(100))
+    district_search = Column(String(100))
+
+    # 📍 Geohash de (latitude, longitude) para búsquedas por cercanía
+    geohash = Column(String(12))
+
+    __table_args__ = (
+        Index("ix_residences_owner_id", "owner_id"),
+        Index("ix_residences_city_search", "city_search", postgresql_ops={"city_search": "varchar_pattern_ops"}),
+        Index("ix_residences_district_search", "district_search", postgresql_ops={"district_search": "varchar_pattern_ops"}),
+        Index("ix_residences_geohash", "geohash", postgresql_ops={"geohash": "varchar_pattern_ops"}),
+    )
+
     # 🔗 Relación con habitaciones
     rooms = relationship("Room", back_populates="residence", cascade="all, delete-orphan")
+
+    @validates("city", "district")
+    def _sync_search_columns(self, key, value):
+        setattr(self, f"{key}_search", fold_text(value))
+        return value
+
+    @validates("latitude", "longitude")
+    def _sync_geohash(self, key, value):
+        lat = value if key == "latitude" else self.latitude
+        lng = value if key == "longitude" else self.longitude
+        self.geohash = geohash_encode(lat, lng) if lat is not None and lng is not None else None
+        return value
 owner = relationship("User", back_populates="residences")
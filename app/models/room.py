@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 import enum
@@ -23,6 +23,10 @@ class Room(Base):
     is_available = Column(Boolean, default=True)
     image_url = Column(String(500), nullable=True)
 
+    # 🔎 Filtros por residencia (listados de reservas y habitaciones)
+    __table_args__ = (
+        Index("ix_rooms_residence_id", "residence_id"),
+    )
 
     # ✅ Relaciones
     residence = relationship("Residence", back_populates="rooms")
@@ -1,6 +1,6 @@
 # app/schemas/chat.py
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 class ConversationBase(BaseModel):
@@ -13,11 +13,21 @@ class ConversationBase(BaseModel):
     student_name: Optional[str] = None
     last_message: Optional[str] = None
     last_message_at: Optional[datetime] = None
+    last_sender_id: Optional[int] = None
+
+    # 👀 Del usuario que consulta
+    last_read_message_id: Optional[int] = None
+    unread_count: int = 0
 
     class Config:
         from_attributes = True
 
 
+class ConversationPage(BaseModel):
+    items: List[ConversationBase]
+    next_cursor: Optional[str] = None
+
+
 class MessageOut(BaseModel):
     id: int
     conversation_id: int
@@ -31,6 +41,28 @@ class MessageOut(BaseModel):
         from_attributes = True
 
 
+class ConversationReadOut(BaseModel):
+    conversation_id: int
+    last_read_message_id: Optional[int] = None
+    unread_count: int
+
+
+class MessageSearchHit(MessageOut):
+    owner_id: int
+    student_id: int
+
+
+class MessageSearchPage(BaseModel):
+    items: List[MessageSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class MessageSync(BaseModel):
+    messages: List[MessageOut]  # incluye la ventana de solape bajo since_id: deduplicar por id
+    high_water: int          # último id entregado; se envía como since_id en la siguiente llamada
+    has_more: bool = False
+
+
 class MessageCreate(BaseModel):
     conversation_id: int
     content: str
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class OwnerDashboardOut(BaseModel):
+    owner_id: int
+
+    # Reservas por estado
+    pending: int
+    confirmed: int
+    cancelled: int
+    rejected: int
+    completed: int
+
+    # Habitaciones
+    rooms_total: int
+    rooms_available: int
+    rooms_occupied: int
+
+    # Ingreso mensual esperado (habitaciones ocupadas)
+    expected_monthly_revenue: float
+
+    updated_at: Optional[datetime] = None
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, field_validator, ValidationInfo
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Literal, Optional
 
 
 # --------------------------------------
@@ -11,6 +11,8 @@ class ReservationStatus(str, Enum):
     PENDING = "PENDING"
     CONFIRMED = "CONFIRMED"
     CANCELLED = "CANCELLED"
+    REJECTED = "REJECTED"
+    COMPLETED = "COMPLETED"
 
 
 # --------------------------------------
@@ -51,3 +53,34 @@ class ReservationOut(BaseModel):
 
     class Config:
         from_attributes = True  # equivale a orm_mode = True (FastAPI 0.115+)
+
+
+# --------------------------------------
+# SCHEMA: Página de reservas (paginación por cursor)
+# --------------------------------------
+class ReservationPage(BaseModel):
+    items: List[ReservationOut]
+    next_cursor: Optional[str] = None
+
+
+
+# --------------------------------------
+# SCHEMAS: Confirmar / rechazar reservas en lote
+# --------------------------------------
+class ReservationBatchRequest(BaseModel):
+    action: Literal["confirm", "reject"]
+    reservation_ids: List[int]
+
+
+class ReservationBatchItemResult(BaseModel):
+    id: int
+    ok: bool
+    status: Optional[ReservationStatus] = None
+    detail: Optional[str] = None
+
+
+class ReservationBatchResult(BaseModel):
+    confirmed: int
+    rejected: int
+    failed: int
+    results: List[ReservationBatchItemResult]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 from enum import Enum
 
 # --- Enumeración del tipo de habitación ---
@@ -47,3 +48,74 @@ class RoomOut(RoomBase):
 
     class Config:
         orm_mode = True
+
+
+# --- Carga masiva (crear/actualizar varias habitaciones en una sola petición) ---
+class RoomBulkUpdateItem(RoomUpdate):
+    id: int
+
+
+class RoomBulkRequest(BaseModel):
+    create: List[RoomCreate] = []
+    update: List[RoomBulkUpdateItem] = []
+
+
+class RoomBulkItemResult(BaseModel):
+    operation: str          # "create" | "update"
+    index: int              # posición del ítem dentro de su lista
+    ok: bool
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class RoomBulkResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[RoomBulkItemResult]
+
+
+# --- Salida con distancia (búsqueda por cercanía) ---
+class RoomNearbyOut(RoomOut):
+    distance_km: float
+
+
+# --- Página de habitaciones (paginación por cursor) ---
+class RoomPage(BaseModel):
+    items: List[RoomOut]
+    next_cursor: Optional[str] = None
+
+
+# --- Facetas de búsqueda (conteos + histograma de precios) ---
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class PriceBucket(BaseModel):
+    min_price: float
+    max_price: float
+    count: int
+
+
+class RoomFacets(BaseModel):
+    total: int
+    types: List[FacetCount]
+    cities: List[FacetCount]
+    with_private_bath: int
+    without_private_bath: int
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    price_histogram: List[PriceBucket]
+
+
+# --- Calendario de disponibilidad ---
+class DateInterval(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class RoomAvailability(BaseModel):
+    room_id: int
+    busy: List[DateInterval]
+    free: List[DateInterval]
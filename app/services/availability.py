@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Query, Session
+
+from app.models.reservation import Reservation, ReservationStatus
+
+Interval = Tuple[datetime, datetime]
+
+
+def reservation_overlaps(start: datetime, end: datetime):
+    """
+    Predicado canónico de solapamiento entre [start, end) y una reserva:
+    inicio < fin_nuevo AND fin > inicio_nuevo.
+    """
+    return and_(Reservation.start_date < end, Reservation.end_date > start)
+
+
+def confirmed_conflicts(db: Session, room_id: int, start: datetime, end: datetime) -> Query:
+    """
+    Reservas CONFIRMED de la habitación que se solapan con [start, end).
+    Servida por ix_reservations_room_status_dates (igualdad en room_id y
+    status, rango en start_date); quien llama añade exclusiones y locks.
+    """
+    return db.query(Reservation.id).filter(
+        Reservation.room_id == room_id,
+        Reservation.status == ReservationStatus.CONFIRMED,
+        reservation_overlaps(start, end),
+    )
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Las fechas se guardan sin zona horaria (UTC); normaliza las que traen zona."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Une intervalos que se solapan o se tocan. Devuelve la lista ordenada."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_intervals(busy: List[Interval], window_start: datetime, window_end: datetime) -> List[Interval]:
+    """Complemento de `busy` (ya unido y ordenado) dentro de la ventana."""
+    free: List[Interval] = []
+    cursor = window_start
+    for start, end in busy:
+        if start > cursor:
+            free.append((cursor, min(start, window_end)))
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            break
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def availability_by_room(
+    rows: Iterable[Tuple[int, datetime, datetime]],
+    room_ids: Iterable[int],
+    window_start: datetime,
+    window_end: datetime,
+) -> Dict[int, Tuple[List[Interval], List[Interval]]]:
+    """
+    Agrupa las reservas (room_id, inicio, fin) por habitación y devuelve
+    {room_id: (ocupado, libre)} recortado a la ventana.
+    """
+    raw: Dict[int, List[Interval]] = {room_id: [] for room_id in room_ids}
+    for room_id, start, end in rows:
+        raw.setdefault(room_id, []).append((max(start, window_start), min(end, window_end)))
+
+    result = {}
+    for room_id, intervals in raw.items():
+        busy = merge_intervals(intervals)
+        result[room_id] = (busy, free_intervals(busy, window_start, window_end))
+    return result
@@ -0,0 +1,35 @@
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from app.models.catalog_version import CatalogVersion
+
+# Tablas cuyo contenido se expone en endpoints con ETag
+CATALOG_TABLES = ("rooms", "residences")
+
+
+def bump_version(db: Session, *tables: str) -> None:
+    """
+    Incrementa la versión de las tablas indicadas dentro de la transacción
+    actual (se confirma junto con el cambio que la provoca).
+    """
+    for name in tables:
+        updated = (
+            db.query(CatalogVersion)
+            .filter(CatalogVersion.table_name == name)
+            .update({CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False)
+        )
+        if not updated:
+            db.add(CatalogVersion(table_name=name, version=1))
+
+
+def get_versions(db: Session, *tables: str) -> Dict[str, int]:
+    """Lee las versiones actuales (lectura por clave primaria)."""
+    rows = (
+        db.query(CatalogVersion.table_name, CatalogVersion.version)
+        .filter(CatalogVersion.table_name.in_(tables))
+        .all()
+    )
+    versions = {name: 0 for name in tables}
+    versions.update({name: version for name, version in rows})
+    return versions
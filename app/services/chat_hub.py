@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Set, Tuple
+
+Subscriber = Tuple[asyncio.AbstractEventLoop, asyncio.Queue]
+Deliver = Callable[[str, Dict[str, Any]], None]
+
+# Mensajes pendientes por conexión; si un cliente lento se llena, se descartan
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class ChatBackend(ABC):
+    """
+    Transporte de eventos del chat entre workers: solo publica en canales y
+    se suscribe a ellos. Las conexiones locales y el reparto a sus colas
+    son de ChatHub; el backend entrega lo recibido llamando a `deliver`.
+
+    Para varios workers basta con otra implementación (p. ej. Redis pub/sub)
+    que en `subscribe` escuche el canal y llame a `deliver` con cada evento.
+    """
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def attach(self, deliver: Deliver) -> None:
+        """Lo llama ChatHub al adoptar el backend."""
+        self._deliver = deliver
+
+    @abstractmethod
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        """Envía el evento a todos los workers suscritos al canal."""
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> None:
+        """Empieza a recibir el canal (primera conexión local que lo escucha)."""
+
+    @abstractmethod
+    def unsubscribe(self, channel: str) -> None:
+        """Deja de recibir el canal (se fue la última conexión local)."""
+
+
+class LocalChatBackend(ChatBackend):
+    """Backend en memoria: un solo proceso (desarrollo, tests, un worker)."""
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        if self._deliver is not None:
+            self._deliver(channel, event)
+
+    def subscribe(self, channel: str) -> None:
+        pass
+
+    def unsubscribe(self, channel: str) -> None:
+        pass
+
+
+def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        pass
+
+
+class ChatHub:
+    """
+    Pub/sub del chat: un canal por usuario con los eventos de sus
+    conversaciones. Guarda las conexiones locales de cada canal y les
+    reparte lo que entrega el backend.
+    """
+
+    def __init__(self, backend: ChatBackend):
+        self._lock = threading.Lock()
+        self._channels: Dict[str, Set[Subscriber]] = {}
+        self.backend = backend
+        backend.attach(self.deliver)
+
+    def set_backend(self, backend: ChatBackend) -> None:
+        backend.attach(self.deliver)
+        with self._lock:
+            previous, self.backend = self.backend, backend
+            for channel in self._channels:
+                backend.subscribe(channel)
+                previous.unsubscribe(channel)
+
+    @staticmethod
+    def user_channel(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    def publish_to_users(self, user_ids: Iterable[int], event: Dict[str, Any]) -> None:
+        for user_id in set(user_ids):
+            if user_id is not None:
+                self.backend.publish(self.user_channel(user_id), event)
+
+    def deliver(self, channel: str, event: Dict[str, Any]) -> None:
+        """Reparte un evento recibido del backend a las conexiones locales del canal."""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for loop, queue in subscribers:
+            # Se puede publicar desde el threadpool (endpoints sync): la cola
+            # se alimenta siempre desde el event loop que la creó
+            loop.call_soon_threadsafe(_offer, queue, event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        channel = self.user_channel(user_id)
+        # El alta/baja en el backend va bajo el lock: una baja del último
+        # suscriptor no puede adelantarse al alta de uno nuevo del mismo canal
+        with self._lock:
+            subscribers = self._channels.setdefault(channel, set())
+            if not subscribers:
+                self.backend.subscribe(channel)
+            subscribers.add(subscriber)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._channels[channel]
+                        self.backend.unsubscribe(channel)
+
+
+chat_hub = ChatHub(LocalChatBackend())
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Iterator, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.db.session import SessionLocal
+
+# Filas que se leen del cursor del servidor en cada vuelta
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _plain(value):
+    """Convierte un valor de la BD a algo serializable en CSV/JSON."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _iter_rows(stmt: Select) -> Iterator[Sequence]:
+    """
+    Recorre `stmt` con un cursor del lado del servidor (`yield_per`
+    activa `stream_results`), así solo hay un lote en memoria a la vez.
+
+    Usa su propia sesión: el generador se consume después de que el
+    endpoint retorna, cuando la sesión de `get_db` ya está cerrada.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _csv_chunks(stmt: Select, header: Sequence[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    # La cabecera se envía antes de ejecutar la consulta (primer byte inmediato)
+    yield buffer.getvalue()
+    for partition in _iter_rows(stmt):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(v) for v in row] for row in partition)
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(stmt: Select, header: Sequence[str]) -> Iterator[str]:
+    for partition in _iter_rows(stmt):
+        yield "".join(
+            json.dumps(dict(zip(header, (_plain(v) for v in row))), ensure_ascii=False) + "\n"
+            for row in partition
+        )
+
+
+def export_response(stmt: Select, header: Sequence[str], fmt: str, filename: str) -> StreamingResponse:
+    """
+    StreamingResponse en CSV o NDJSON para una consulta de columnas.
+    `header` da el nombre de cada columna del SELECT, en el mismo orden.
+    """
+    chunks = _csv_chunks(stmt, header) if fmt == "csv" else _ndjson_chunks(stmt, header)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
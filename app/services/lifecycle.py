@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, exists, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.residence import Residence
+from app.models.room import Room
+from app.services import owner_stats
+from app.services.catalog_version import bump_version
+
+
+def complete_expired_reservations(db: Session, now: Optional[datetime] = None, batch_size: int = 500) -> int:
+    """
+    Pasa a COMPLETED las reservas CONFIRMED cuyo end_date ya pasó y libera
+    sus habitaciones (si no tienen otra reserva confirmada vigente).
+
+    Trabaja en lotes de `batch_size` con UPDATEs por conjunto; cada lote es
+    una transacción corta para no retener locks. Devuelve cuántas reservas
+    se completaron.
+    """
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        rows = db.execute(
+            select(Reservation.id, Reservation.room_id)
+            .where(Reservation.status == ReservationStatus.CONFIRMED, Reservation.end_date <= now)
+            .order_by(Reservation.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        reservation_ids = [r.id for r in rows]
+        room_ids = {r.room_id for r in rows}
+
+        db.execute(
+            update(Reservation)
+            .where(Reservation.id.in_(reservation_ids), Reservation.status == ReservationStatus.CONFIRMED)
+            .values(status=ReservationStatus.COMPLETED)
+            .execution_options(synchronize_session=False)
+        )
+
+        still_booked = exists().where(
+            and_(
+                Reservation.room_id == Room.id,
+                Reservation.status == ReservationStatus.CONFIRMED,
+                Reservation.end_date > now,
+            )
+        )
+        db.execute(
+            update(Room)
+            .where(Room.id.in_(room_ids), Room.is_available.is_not(True), ~still_booked)
+            .values(is_available=True)
+            .execution_options(synchronize_session=False)
+        )
+
+        owner_ids = db.execute(
+            select(Residence.owner_id)
+            .join(Room, Room.residence_id == Residence.id)
+            .where(Room.id.in_(room_ids))
+            .distinct()
+        ).scalars()
+        owner_stats.recompute_many(db, owner_ids)
+        bump_version(db, "rooms")
+        db.commit()
+
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
+
+
+def _run_lifecycle_once() -> int:
+    db = SessionLocal()
+    try:
+        return complete_expired_reservations(db, batch_size=settings.LIFECYCLE_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+async def lifecycle_scheduler():
+    """
+    Tarea en segundo plano (arrancada desde el lifespan de la app) que
+    ejecuta el ciclo de vida de reservas cada LIFECYCLE_INTERVAL_SECONDS.
+    El trabajo con la BD corre en un hilo para no bloquear el event loop.
+    """
+    while True:
+        try:
+            completed = await asyncio.to_thread(_run_lifecycle_once)
+            if completed:
+                print(f"🗓️ Reservas completadas: {completed}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print(f"⚠️ Error en el ciclo de vida de reservas: {exc}")
+        await asyncio.sleep(settings.LIFECYCLE_INTERVAL_SECONDS)
@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models.owner_stats import OwnerStats
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.residence import Residence
+from app.models.room import Room
+
+# Columna de OwnerStats para cada estado de reserva
+STATUS_COLUMNS = {
+    ReservationStatus.PENDING: "pending",
+    ReservationStatus.CONFIRMED: "confirmed",
+    ReservationStatus.CANCELLED: "cancelled",
+    ReservationStatus.REJECTED: "rejected",
+    ReservationStatus.COMPLETED: "completed",
+}
+
+
+def room_contribution(is_available: Optional[bool], price: Optional[float]) -> Dict[str, float]:
+    """Aporte de una habitación al resumen del propietario."""
+    occupied = not is_available
+    return {
+        "rooms_total": 1,
+        "rooms_available": 0 if occupied else 1,
+        "expected_monthly_revenue": (price or 0.0) if occupied else 0.0,
+    }
+
+
+def room_change(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    """Diferencia entre dos aportes (p. ej. antes y después de editar una habitación)."""
+    return {key: after[key] - before[key] for key in after}
+
+
+def status_change(old: Optional[ReservationStatus], new: ReservationStatus) -> Dict[str, int]:
+    """Delta de contadores al pasar una reserva de `old` a `new` (old=None: reserva nueva)."""
+    delta = {STATUS_COLUMNS[new]: 1}
+    if old is not None:
+        delta[STATUS_COLUMNS[old]] = delta.get(STATUS_COLUMNS[old], 0) - 1
+    return delta
+
+
+def owner_of_residence(db: Session, residence_id: Optional[int]) -> Optional[int]:
+    if residence_id is None:
+        return None
+    return db.query(Residence.owner_id).filter(Residence.id == residence_id).scalar()
+
+
+def recompute(db: Session, owner_id: Optional[int]) -> Optional[OwnerStats]:
+    """
+    Recalcula el resumen completo de un propietario dentro de la transacción
+    actual. Se usa para cambios en cascada (borrados, cambio de dueño, lotes)
+    y para crear la fila la primera vez.
+    """
+    if owner_id is None:
+        return None
+    db.flush()
+
+    stats = db.get(OwnerStats, owner_id)
+    if stats is None:
+        stats = OwnerStats(owner_id=owner_id)
+        db.add(stats)
+
+    counts = dict(
+        db.query(Reservation.status, func.count(Reservation.id))
+        .join(Room, Room.id == Reservation.room_id)
+        .join(Residence, Residence.id == Room.residence_id)
+        .filter(Residence.owner_id == owner_id)
+        .group_by(Reservation.status)
+        .all()
+    )
+    for status, column in STATUS_COLUMNS.items():
+        setattr(stats, column, counts.get(status, 0))
+
+    total, available, revenue = (
+        db.query(
+            func.count(Room.id),
+            func.sum(case((Room.is_available.is_(True), 1), else_=0)),
+            func.sum(case((Room.is_available.is_(True), 0.0), else_=Room.price_per_month)),
+        )
+        .join(Residence, Residence.id == Room.residence_id)
+        .filter(Residence.owner_id == owner_id)
+        .one()
+    )
+    stats.rooms_total = total or 0
+    stats.rooms_available = available or 0
+    stats.expected_monthly_revenue = revenue or 0.0
+    return stats
+
+
+def recompute_many(db: Session, owner_ids: Iterable[Optional[int]]) -> None:
+    for owner_id in set(owner_ids):
+        recompute(db, owner_id)
+
+
+def record(db: Session, owner_id: Optional[int], *deltas: Dict[str, float]) -> None:
+    """
+    Aplica incrementos al resumen del propietario con un UPDATE atómico
+    (col = col + delta) en la transacción actual. Si aún no existe la fila
+    se calcula completa (ya incluyendo el cambio en curso).
+    """
+    if owner_id is None:
+        return
+    values: Dict[str, float] = {}
+    for delta in deltas:
+        for key, value in delta.items():
+            values[key] = values.get(key, 0) + value
+    values = {key: value for key, value in values.items() if value}
+    if not values:
+        return
+
+    updated = (
+        db.query(OwnerStats)
+        .filter(OwnerStats.owner_id == owner_id)
+        .update(
+            {getattr(OwnerStats, key): getattr(OwnerStats, key) + value for key, value in values.items()},
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        recompute(db, owner_id)
@@ -0,0 +1,246 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.pagination import encode_cursor
+from app.core.text import fold_text
+from app.services.catalog_version import get_versions
+from app.models.residence import Residence
+from app.models.room import Room, RoomType
+from app.schemas.room import RoomOut, RoomType as RoomTypeOut
+
+
+def _mask(positions, size: int) -> int:
+    """Bitset con los bits `positions` encendidos (se arma en bytes, no bit a bit sobre el int)."""
+    buffer = bytearray((size + 7) // 8)
+    for pos in positions:
+        buffer[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buffer, "little")
+
+
+# Cada cuántas posiciones (en orden de precio/capacidad) se guarda una
+# máscara acumulada; el resto de un rango se completa bit a bit
+_CHECKPOINT_EVERY = 256
+
+
+class _SortedColumn:
+    """
+    Columna numérica ordenada para convertir un rango [min, max] en bitset
+    con bisect: máscaras acumuladas cada _CHECKPOINT_EVERY posiciones en
+    orden de valor, así cada rango cuesta O(log n + n/64) y no O(n) pasos.
+    """
+
+    def __init__(self, values):
+        self.order = sorted(range(len(values)), key=values.__getitem__)
+        self.values = [values[pos] for pos in self.order]
+        self.checkpoints = [0]
+        buffer = bytearray((len(values) + 7) // 8)
+        for i, pos in enumerate(self.order, 1):
+            buffer[pos >> 3] |= 1 << (pos & 7)
+            if i % _CHECKPOINT_EVERY == 0:
+                self.checkpoints.append(int.from_bytes(buffer, "little"))
+
+    def _prefix(self, count: int) -> int:
+        """Bitset de las `count` primeras posiciones en orden de valor."""
+        block = count // _CHECKPOINT_EVERY
+        mask = self.checkpoints[block]
+        for pos in self.order[block * _CHECKPOINT_EVERY:count]:
+            mask |= 1 << pos
+        return mask
+
+    def range_mask(self, low: Optional[float], high: Optional[float]) -> int:
+        start = bisect_left(self.values, low) if low is not None else 0
+        end = bisect_right(self.values, high) if high is not None else len(self.values)
+        if start >= end:
+            return 0
+        return self._prefix(end) & ~self._prefix(start)
+
+
+class _Snapshot:
+    """
+    Foto inmutable del catálogo de habitaciones, ordenada por Room.id.
+
+    - Bitsets (int de Python, bit i = posición i) por tipo, disponibilidad,
+      residencia y ciudad/distrito normalizados (fold_text).
+    - Precio y capacidad ordenados (_SortedColumn) para filtrar por rango.
+    """
+
+    def __init__(self, rows, versions: Tuple[int, int]):
+        # (versión de rooms, versión de residences) leídas antes que las filas
+        self.versions = versions
+        self.ids = array("q")
+        # Filas crudas: el RoomOut solo se arma para las que salen en la página
+        self.rows = rows
+        available: List[int] = []
+        by_type: Dict[str, List[int]] = {}
+        by_residence: Dict[int, List[int]] = {}
+        by_place: Dict[str, List[int]] = {}
+        prices = []
+        capacities = []
+
+        for pos, row in enumerate(rows):
+            room_type = row.type or RoomType.HABITACION
+            self.ids.append(row.id)
+            prices.append(row.price_per_month)
+            capacities.append(row.capacity if row.capacity is not None else 1)
+            if row.is_available:
+                available.append(pos)
+            by_type.setdefault(room_type.value, []).append(pos)
+            by_residence.setdefault(row.residence_id, []).append(pos)
+            for place in {row.city_search, row.district_search}:
+                if place:
+                    by_place.setdefault(place, []).append(pos)
+
+        size = len(self.ids)
+        self.available = _mask(available, size)
+        self.by_type = {key: _mask(positions, size) for key, positions in by_type.items()}
+        self.by_residence = {key: _mask(positions, size) for key, positions in by_residence.items()}
+        self.by_place = {key: _mask(positions, size) for key, positions in by_place.items()}
+        self.prices = _SortedColumn(prices)
+        self.capacities = _SortedColumn(capacities)
+        # Claves ordenadas para resolver búsquedas por prefijo con bisect
+        self.place_keys = sorted(self.by_place)
+        self.all = (1 << len(self.ids)) - 1
+
+    def _room_out(self, pos: int) -> RoomOut:
+        row = self.rows[pos]
+        # Valores ya tipados por SQLAlchemy: se construye sin revalidar
+        return RoomOut.model_construct(
+            id=row.id,
+            residence_id=row.residence_id,
+            title=row.title,
+            description=row.description,
+            image_url=row.image_url,
+            type=RoomTypeOut((row.type or RoomType.HABITACION).value),
+            capacity=row.capacity if row.capacity is not None else 1,
+            price_per_month=row.price_per_month,
+            has_private_bath=bool(row.has_private_bath),
+            is_available=bool(row.is_available),
+        )
+
+    def search(
+        self,
+        residence_id: Optional[int],
+        city: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        capacity: Optional[int],
+        room_type: Optional[RoomType],
+        only_available: bool,
+        limit: int,
+        after_id: Optional[int],
+    ) -> Tuple[List[RoomOut], Optional[str]]:
+        mask = self.all
+        if only_available:
+            mask &= self.available
+        if residence_id is not None:
+            mask &= self.by_residence.get(residence_id, 0)
+        if room_type is not None:
+            mask &= self.by_type.get(room_type.value, 0)
+        if city:
+            # Mismo criterio que la BD: prefijo sobre ciudad/distrito normalizados
+            needle = fold_text(city)
+            places = 0
+            for key in self.place_keys[bisect_left(self.place_keys, needle):]:
+                if not key.startswith(needle):
+                    break
+                places |= self.by_place[key]
+            mask &= places
+        if min_price is not None or max_price is not None:
+            mask &= self.prices.range_mask(min_price, max_price)
+        if capacity is not None:
+            mask &= self.capacities.range_mask(capacity, None)
+
+        start = bisect_right(self.ids, after_id) if after_id is not None else 0
+        mask >>= start
+
+        # Solo se recorren los bits de la página (+1 para saber si hay más)
+        items: List[RoomOut] = []
+        while mask:
+            low = mask & -mask
+            if len(items) == limit:
+                return items, encode_cursor(items[-1].id)
+            mask ^= low
+            items.append(self._room_out(start + low.bit_length() - 1))
+        return items, None
+
+
+class RoomIndex:
+    """
+    Índice en memoria del catálogo de habitaciones para las búsquedas.
+
+    Se construye de forma perezosa desde la BD y queda asociado a las
+    versiones de rooms/residences (catalog_versions) con las que se leyó;
+    cada escritura las incrementa, así que la foto se reconstruye en cuanto
+    cambian, en cualquier worker, y nunca sirve datos más viejos que el ETag
+    calculado con esas mismas versiones. Una sola petición reconstruye a la
+    vez; las demás esperan y reutilizan esa foto.
+    """
+
+    def __init__(self):
+        self._build_lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+
+    @staticmethod
+    def _is_fresh(snapshot: Optional[_Snapshot], versions: Tuple[int, int]) -> bool:
+        # Una foto más nueva que las versiones leídas (transacción anterior a
+        # la última escritura) también sirve
+        return snapshot is not None and all(
+            built >= current for built, current in zip(snapshot.versions, versions)
+        )
+
+    def _get_snapshot(self, db: Session, versions: Tuple[int, int]) -> _Snapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, versions):
+            return snapshot
+
+        with self._build_lock:
+            # Otra petición pudo reconstruirla mientras se esperaba el lock
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot, versions):
+                return snapshot
+
+            rows = (
+                db.query(
+                    Room.id,
+                    Room.residence_id,
+                    Room.title,
+                    Room.description,
+                    Room.image_url,
+                    Room.type,
+                    Room.capacity,
+                    Room.price_per_month,
+                    Room.has_private_bath,
+                    Room.is_available,
+                    Residence.city_search,
+                    Residence.district_search,
+                )
+                .outerjoin(Residence, Residence.id == Room.residence_id)
+                .order_by(Room.id.asc())
+                .all()
+            )
+            # Las filas son al menos tan nuevas como `versions` (se leyeron después)
+            snapshot = _Snapshot(rows, versions)
+            self._snapshot = snapshot
+            return snapshot
+
+    def search(
+        self,
+        db: Session,
+        *,
+        limit: int,
+        after_id: Optional[int] = None,
+        versions: Optional[Dict[str, int]] = None,
+        **filters,
+    ):
+        """`versions`: las de get_versions(db, "rooms", "residences") si ya se leyeron (ETag)."""
+        if versions is None:
+            versions = get_versions(db, "rooms", "residences")
+        snapshot = self._get_snapshot(db, (versions["rooms"], versions["residences"]))
+        return snapshot.search(limit=limit, after_id=after_id, **filters)
+
+
+room_index = RoomIndex()
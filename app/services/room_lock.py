@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.room import Room
+
+LOCK_CONFLICT_DETAIL = "La habitación está siendo reservada, intenta nuevamente"
+
+
+@contextmanager
+def lock_conflicts_as_409(db: Session, detail: str = LOCK_CONFLICT_DETAIL):
+    """
+    Sección crítica sobre una o varias habitaciones: cualquier
+    OperationalError (espera de lock vencida, deadlock, BD bloqueada en
+    SQLite) en los locks, las comprobaciones, los contadores o el COMMIT se
+    responde con 409 + Retry-After para que el cliente reintente.
+    """
+    try:
+        yield
+    except OperationalError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=detail, headers={"Retry-After": "1"})
+
+
+def lock_room(db: Session, room_id: int) -> Optional[Room]:
+    """
+    SELECT ... FOR UPDATE sobre la fila de la habitación.
+
+    Serializa las escrituras sobre esa habitación (reservas, confirmaciones,
+    ediciones) sin bloquear las demás. Se llama dentro de lock_conflicts_as_409.
+    """
+    return db.query(Room).filter(Room.id == room_id).with_for_update().populate_existing().first()
@@ -0,0 +1,123 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import lambda_stmt, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.pagination import encode_cursor
+from app.core.responses import ListSerializer
+from app.core.text import fold_text, like_prefix
+from app.models.residence import Residence
+from app.models.room import Room, RoomType
+from app.schemas.room import RoomOut
+
+# Solo las columnas que necesita RoomOut (sin hidratar instancias ORM)
+ROOM_OUT_COLUMNS = (
+    Room.id,
+    Room.residence_id,
+    Room.title,
+    Room.description,
+    Room.image_url,
+    Room.type,
+    Room.capacity,
+    Room.price_per_month,
+    Room.has_private_bath,
+    Room.is_available,
+)
+
+ROOM_OUT_LIST = ListSerializer(RoomOut)
+
+
+def apply_room_filters(
+    q,
+    residence_id: Optional[int],
+    city: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    capacity: Optional[int],
+    room_type: Optional[RoomType],
+    residence_joined: bool = False,
+):
+    """Aplica los filtros comunes de búsqueda de habitaciones a una consulta sobre Room."""
+    # Filtro por residencia
+    if residence_id is not None:
+        q = q.filter(Room.residence_id == residence_id)
+
+    # Filtro por ciudad o distrito (prefijo sobre columnas normalizadas e indexadas)
+    if city:
+        pattern = like_prefix(fold_text(city))
+        if not residence_joined:
+            q = q.join(Room.residence)
+        q = q.filter(
+            or_(
+                Residence.city_search.like(pattern, escape="\\"),
+                Residence.district_search.like(pattern, escape="\\"),
+            )
+        )
+
+    # Filtros adicionales
+    if min_price is not None:
+        q = q.filter(Room.price_per_month >= min_price)
+    if max_price is not None:
+        q = q.filter(Room.price_per_month <= max_price)
+    if room_type is not None:
+        q = q.filter(Room.type == room_type)
+    if capacity is not None:
+        q = q.filter(Room.capacity >= capacity)
+    return q
+
+
+def search_rooms(
+    db: Session,
+    *,
+    residence_id: Optional[int],
+    city: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    capacity: Optional[int],
+    room_type: Optional[RoomType],
+    only_available: bool,
+    limit: int,
+    after_id: Optional[int] = None,
+) -> Tuple[List[RoomOut], Optional[str]]:
+    """
+    Búsqueda de habitaciones en la BD con paginación por cursor (Room.id).
+
+    Se arma con `lambda_stmt`: cada combinación de filtros se compila una
+    sola vez y queda en la caché de SQLAlchemy; los valores viajan como
+    parámetros enlazados.
+    """
+    stmt = lambda_stmt(lambda: select(*ROOM_OUT_COLUMNS))
+
+    if residence_id is not None:
+        stmt += lambda s: s.where(Room.residence_id == residence_id)
+    if city:
+        pattern = like_prefix(fold_text(city))
+        stmt += lambda s: s.join(Residence, Residence.id == Room.residence_id).where(
+            or_(
+                Residence.city_search.like(pattern, escape="\\"),
+                Residence.district_search.like(pattern, escape="\\"),
+            )
+        )
+    if min_price is not None:
+        stmt += lambda s: s.where(Room.price_per_month >= min_price)
+    if max_price is not None:
+        stmt += lambda s: s.where(Room.price_per_month <= max_price)
+    if room_type is not None:
+        stmt += lambda s: s.where(Room.type == room_type)
+    if capacity is not None:
+        stmt += lambda s: s.where(Room.capacity >= capacity)
+    if only_available:
+        stmt += lambda s: s.where(Room.is_available.is_(True))
+    if after_id is not None:
+        stmt += lambda s: s.where(Room.id > after_id)
+
+    page_size = limit + 1
+    stmt += lambda s: s.order_by(Room.id.asc()).limit(page_size)
+
+    rows = db.execute(stmt).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return ROOM_OUT_LIST.validate(rows), next_cursor
@@ -0,0 +1,169 @@
+"""
+Throughput de POST /reservations/ bajo contención.
+
+Lanza --workers hilos que crean reservas a la vez (cada petición con un
+estudiante distinto) en dos escenarios:
+
+- hot:    todas sobre la misma habitación (se serializan en su lock FOR UPDATE)
+- spread: cada hilo sobre su propia habitación (no deberían esperarse entre sí)
+
+Los 409 (lock vencido / deadlock) se reintentan tras Retry-After, hasta
+--retries veces. Se informa peticiones/s, latencia y códigos de respuesta.
+
+    python -m bench.booking_contention --target-rps 50
+    python -m bench.booking_contention --workers 32 --requests 50 --db-url mysql+pymysql://u:p@localhost/bench
+
+⚠️ --db-url debe apuntar a una BD vacía de pruebas: se crean y borran tablas.
+En SQLite (por defecto) toda escritura toma el lock de la BD completa, así
+que ambos escenarios se serializan; la diferencia hot/spread solo se ve en
+MySQL/PostgreSQL.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=25, help="peticiones por hilo")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--target-rps", type=float, default=None, help="sale con error si algún escenario queda por debajo")
+    return parser.parse_args()
+
+
+def setup_data(db, workers: int, total_students: int):
+    """Un owner, una habitación por hilo y un estudiante por petición."""
+    from sqlalchemy import insert
+
+    from app.core.security import create_access_token
+    from app.models.residence import Residence
+    from app.models.room import Room
+    from app.models.user import User, UserRole
+
+    owner = User(email="owner@bench", hashed_password="-", full_name="Owner", role=UserRole.OWNER)
+    db.add(owner)
+    db.flush()
+    residence = Residence(owner_id=owner.id, name="Bench")
+    db.add(residence)
+    db.flush()
+    rooms = [Room(residence_id=residence.id, title=f"Room {i}", price_per_month=100.0) for i in range(workers)]
+    db.add_all(rooms)
+    db.execute(
+        insert(User),
+        [
+            {"email": f"student{i}@bench", "hashed_password": "-", "full_name": f"Student {i}", "role": UserRole.STUDENT}
+            for i in range(total_students)
+        ],
+    )
+    db.commit()
+    student_ids = [user_id for (user_id,) in db.query(User.id).filter(User.role == UserRole.STUDENT).order_by(User.id)]
+    tokens = [{"Authorization": f"Bearer {create_access_token(user_id)}"} for user_id in student_ids]
+    return [room.id for room in rooms], tokens
+
+
+def run_scenario(client, room_for_worker, tokens, workers: int, per_worker: int, retries: int):
+    barrier = threading.Barrier(workers)
+    latencies = []
+    codes = Counter()
+    retried = Counter()
+    lock = threading.Lock()
+
+    def worker(w: int):
+        barrier.wait()
+        for r in range(per_worker):
+            headers = tokens[w * per_worker + r]
+            start = datetime(2031, 1, 1) + timedelta(days=r)
+            body = {
+                "room_id": room_for_worker(w),
+                "start_date": start.isoformat(),
+                "end_date": (start + timedelta(days=30)).isoformat(),
+            }
+            began = time.perf_counter()
+            for attempt in range(retries + 1):
+                response = client.post("/api/v1/reservations/", json=body, headers=headers)
+                if response.status_code != 409 or "Retry-After" not in response.headers:
+                    break
+                with lock:
+                    retried[attempt] += 1
+                time.sleep(min(float(response.headers["Retry-After"]), 0.05))
+            elapsed = time.perf_counter() - began
+            with lock:
+                latencies.append(elapsed)
+                codes[response.status_code] += 1
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(workers)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+
+    latencies.sort()
+    return {
+        "req/s": len(latencies) / wall,
+        "p50 ms": statistics.median(latencies) * 1e3,
+        "p95 ms": latencies[int(len(latencies) * 0.95)] * 1e3,
+        "codes": dict(codes),
+        "retries": sum(retried.values()),
+    }
+
+
+def main():
+    args = parse_args()
+    workdir = None
+    if args.db_url is None:
+        workdir = tempfile.TemporaryDirectory()
+        args.db_url = f"sqlite:///{os.path.join(workdir.name, 'bench.db')}"
+    # La app lee DB_URL al importarse: nunca se toca la BD configurada en .env
+    os.environ["DB_URL"] = args.db_url
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    import app.main
+    from app.db.session import Base, SessionLocal, engine
+
+    if engine.dialect.name == "sqlite":
+        # SQLite no tiene FOR UPDATE: BEGIN IMMEDIATE toma el lock de escritura
+        # al empezar (lo más parecido), en vez de chocar al escribir (409)
+        event.listen(engine, "connect", lambda conn, _record: setattr(conn, "isolation_level", None))
+        event.listen(engine, "begin", lambda conn: conn.exec_driver_sql("BEGIN IMMEDIATE"))
+
+    client = TestClient(app.main.app)
+    below_target = []
+    per_scenario = args.workers * args.requests
+    for name, pick_room in (("hot", lambda rooms: lambda w: rooms[0]), ("spread", lambda rooms: lambda w: rooms[w])):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        rooms, tokens = setup_data(db, args.workers, per_scenario)
+        db.close()
+
+        result = run_scenario(client, pick_room(rooms), tokens, args.workers, args.requests, args.retries)
+        print(
+            f"{name:>6}: {result['req/s']:8.1f} req/s  p50 {result['p50 ms']:7.1f} ms  "
+            f"p95 {result['p95 ms']:7.1f} ms  reintentos {result['retries']:>4}  códigos {result['codes']}"
+        )
+        if args.target_rps is not None and result["req/s"] < args.target_rps:
+            below_target.append(name)
+
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    if workdir is not None:
+        workdir.cleanup()
+    if below_target:
+        sys.exit(f"Por debajo de {args.target_rps} req/s: {', '.join(below_target)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark de la comprobación de solapamiento de create_reservation.
+
+Siembra el historial de reservas en una BD desechable (SQLite temporal por
+defecto, o --db-url) y mide la consulta de conflictos (confirmed_conflicts)
+para cada tamaño. Con ix_reservations_room_status_dates el tiempo por
+consulta debe mantenerse plano aunque el historial crezca 100x.
+
+    python -m bench.reservation_conflict
+    python -m bench.reservation_conflict --sizes 1000 100000 --probes 5000
+    python -m bench.reservation_conflict --db-url postgresql+psycopg://u:p@localhost/bench
+
+⚠️ --db-url debe apuntar a una BD vacía de pruebas: se crean y vacían tablas.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOMS = 200
+HISTORY_START = datetime(2020, 1, 1)
+HISTORY_DAYS = 6 * 365
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--probes", type=int, default=2_000)
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def seed(db, size: int, rng: random.Random) -> None:
+    """Historial de `size` reservas repartidas entre ROOMS habitaciones."""
+    from sqlalchemy import delete, insert
+
+    from app.models.reservation import Reservation, ReservationStatus
+
+    db.execute(delete(Reservation))
+    statuses = list(ReservationStatus)
+    batch = []
+    for _ in range(size):
+        start = HISTORY_START + timedelta(days=rng.randrange(HISTORY_DAYS))
+        batch.append(
+            {
+                "room_id": rng.randint(1, ROOMS),
+                "student_id": 2,
+                "start_date": start,
+                "end_date": start + timedelta(days=rng.randint(30, 180)),
+                "status": rng.choice(statuses),
+                "total_price": 0.0,
+            }
+        )
+        if len(batch) == 10_000:
+            db.execute(insert(Reservation), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Reservation), batch)
+    db.commit()
+
+
+def probe_plan(db) -> str:
+    """Plan de la consulta en SQLite (en otros motores, usar EXPLAIN a mano)."""
+    from sqlalchemy import text
+
+    from app.services.availability import confirmed_conflicts
+
+    if db.get_bind().dialect.name != "sqlite":
+        return ""
+    query = confirmed_conflicts(db, 1, HISTORY_START, HISTORY_START + timedelta(days=30)).limit(1)
+    compiled = query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "; ".join(row[-1] for row in rows)
+
+
+def run_probes(db, probes: int, rng: random.Random):
+    from app.services.availability import confirmed_conflicts
+
+    timings = []
+    for _ in range(probes):
+        room_id = rng.randint(1, ROOMS)
+        start = HISTORY_START + timedelta(days=rng.randrange(HISTORY_DAYS))
+        end = start + timedelta(days=rng.randint(30, 180))
+        began = time.perf_counter()
+        confirmed_conflicts(db, room_id, start, end).first()
+        timings.append(time.perf_counter() - began)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def main():
+    args = parse_args()
+    workdir = None
+    if args.db_url is None:
+        workdir = tempfile.TemporaryDirectory()
+        args.db_url = f"sqlite:///{os.path.join(workdir.name, 'bench.db')}"
+    # La app lee DB_URL al importarse: nunca se toca la BD configurada en .env
+    os.environ["DB_URL"] = args.db_url
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import app.main  # noqa: F401  (registra todos los modelos)
+    from app.db.session import Base, SessionLocal, engine
+    from app.models.residence import Residence
+    from app.models.room import Room
+    from app.models.user import User, UserRole
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if not db.get(User, 1):
+        db.add(User(id=1, email="owner@bench", hashed_password="-", full_name="Owner", role=UserRole.OWNER))
+        db.add(User(id=2, email="student@bench", hashed_password="-", full_name="Student", role=UserRole.STUDENT))
+        db.add(Residence(id=1, owner_id=1, name="Bench"))
+        db.add_all(Room(id=i, residence_id=1, title=f"Room {i}", price_per_month=100.0) for i in range(1, ROOMS + 1))
+        db.commit()
+
+    rng = random.Random(args.seed)
+    print(f"{'reservas':>10} {'mediana (µs)':>14} {'p95 (µs)':>10}  plan")
+    for size in args.sizes:
+        seed(db, size, rng)
+        run_probes(db, min(args.probes, 200), rng)  # calentamiento (caché de páginas/sentencias)
+        median, p95 = run_probes(db, args.probes, rng)
+        print(f"{size:>10} {median * 1e6:>14.1f} {p95 * 1e6:>10.1f}  {probe_plan(db)}")
+
+    db.close()
+    engine.dispose()
+    if workdir is not None:
+        workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+# La app lee DB_URL al importarse: los tests usan siempre su propia SQLite temporal
+_DB_DIR = tempfile.mkdtemp(prefix="esturooms-tests-")
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import app.main
+from app.core.security import create_access_token
+from app.db.session import Base, SessionLocal, engine
+from app.models.residence import Residence
+from app.models.room import Room
+from app.models.user import User, UserRole
+
+
+# pysqlite no abre transacción antes de los SELECT. Con BEGIN explícito
+# SQLite mantiene sus locks durante toda la transacción y los choques entre
+# escritores llegan como OperationalError ("database is locked"), igual que
+# un lock vencido o un deadlock en MySQL/PostgreSQL.
+@event.listens_for(engine, "connect")
+def _sqlite_manual_transactions(dbapi_connection, _record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _sqlite_begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(autouse=True)
+def schema():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    # expire_on_commit=False: leer los objetos creados no abre otra
+    # transacción (en SQLite un lector abierto bloquea el COMMIT de la app)
+    session = SessionLocal(expire_on_commit=False)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client():
+    # Sin `with`: no se ejecuta el lifespan (init_db, tareas periódicas)
+    return TestClient(app.main.app)
+
+
+@pytest.fixture
+def make_user(db):
+    counter = iter(range(1, 1_000_000))
+
+    def _make_user(role: UserRole = UserRole.STUDENT, full_name: str = None) -> User:
+        n = next(counter)
+        user = User(
+            email=f"{role.value.lower()}{n}@test.local",
+            hashed_password="-",
+            full_name=full_name or f"{role.value.title()} {n}",
+            role=role,
+        )
+        db.add(user)
+        db.commit()
+        return user
+
+    return _make_user
+
+
+@pytest.fixture
+def make_room(db):
+    def _make_room(owner: User, price: float = 500.0, **fields) -> Room:
+        residence = Residence(owner_id=owner.id, name=f"Residencia de {owner.full_name}", city="Cusco")
+        db.add(residence)
+        db.flush()
+        room = Room(residence_id=residence.id, title="Habitación", price_per_month=price, **fields)
+        db.add(room)
+        db.commit()
+        return room
+
+    return _make_room
+
+
+@pytest.fixture
+def count_queries():
+    """`with count_queries() as queries:` -> queries[0] = sentencias SQL ejecutadas."""
+
+    @contextmanager
+    def _count():
+        queries = [0]
+
+        def _before_cursor_execute(*_args):
+            queries[0] += 1
+
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        try:
+            yield queries
+        finally:
+            event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+    return _count
+
+
+def auth_headers(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+@pytest.fixture
+def auth():
+    return auth_headers
@@ -0,0 +1,218 @@
+import threading
+
+from app.models.chat import Message
+from app.models.user import UserRole
+
+
+def test_inbox_cursor_walks_every_conversation_once(client, auth, make_user):
+    owner = make_user(UserRole.OWNER)
+    students = [make_user() for _ in range(5)]
+    for student in students:
+        response = client.post(
+            "/api/v1/chat/conversations/by-users",
+            params={"owner_id": owner.id, "student_id": student.id},
+            headers=auth(owner),
+        )
+        assert response.status_code == 200
+    # Algunas con mensajes (resumen escrito por send_message) y otras vacías
+    for conversation_id in (1, 3):
+        client.post(
+            "/api/v1/chat/messages",
+            json={"conversation_id": conversation_id, "content": "hola"},
+            headers=auth(owner),
+        )
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/v1/chat/conversations", params=params, headers=auth(owner)).json()
+        seen += [item["id"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None or pages > 5:
+            break
+
+    assert pages == 3
+    assert sorted(seen) == [1, 2, 3, 4, 5]
+
+
+def test_chat_hub_keeps_local_fan_out_and_only_subscribes_channels_on_backend():
+    import asyncio
+
+    import pytest
+
+    from app.services.chat_hub import ChatBackend, ChatHub
+
+    with pytest.raises(TypeError):
+        ChatBackend()
+
+    class RecordingBackend(ChatBackend):
+        def __init__(self):
+            super().__init__()
+            self.calls = []
+
+        def publish(self, channel, event):
+            self.calls.append(("publish", channel))
+            self._deliver(channel, event)
+
+        def subscribe(self, channel):
+            self.calls.append(("subscribe", channel))
+
+        def unsubscribe(self, channel):
+            self.calls.append(("unsubscribe", channel))
+
+    backend = RecordingBackend()
+    hub = ChatHub(backend)
+
+    async def scenario():
+        async with hub.subscribe(7) as first, hub.subscribe(7) as second:
+            hub.publish_to_users([7, 8], {"type": "message"})
+            return await asyncio.wait_for(first.get(), 1), await asyncio.wait_for(second.get(), 1)
+
+    assert asyncio.run(scenario()) == ({"type": "message"}, {"type": "message"})
+    assert [c for c in backend.calls if c[0] != "publish"] == [("subscribe", "user:7"), ("unsubscribe", "user:7")]
+
+
+def test_sync_redelivers_messages_that_commit_below_the_high_water(client, db, auth, make_user):
+    owner, student = make_user(UserRole.OWNER), make_user()
+    convo = client.post(
+        "/api/v1/chat/conversations/by-users",
+        params={"owner_id": owner.id, "student_id": student.id},
+        headers=auth(owner),
+    ).json()
+    # id 10 confirma antes que id 5 (transacciones concurrentes)
+    db.add(Message(id=10, conversation_id=convo["id"], sender_id=owner.id, content="primero"))
+    db.commit()
+    first = client.get("/api/v1/chat/sync", headers=auth(student)).json()
+    assert [m["id"] for m in first["messages"]] == [10]
+
+    db.add(Message(id=5, conversation_id=convo["id"], sender_id=owner.id, content="tardío"))
+    db.commit()
+    second = client.get("/api/v1/chat/sync", params={"since_id": first["high_water"]}, headers=auth(student)).json()
+
+    assert [m["id"] for m in second["messages"]] == [5, 10]
+    assert second["high_water"] == 10
+    assert second["has_more"] is False
+
+
+def test_mark_read_clamps_message_id_to_the_conversation(client, auth, make_user):
+    owner, student = make_user(UserRole.OWNER), make_user()
+    convo = client.post(
+        "/api/v1/chat/conversations/by-users",
+        params={"owner_id": owner.id, "student_id": student.id},
+        headers=auth(owner),
+    ).json()
+    sent = client.post(
+        "/api/v1/chat/messages", json={"conversation_id": convo["id"], "content": "hola"}, headers=auth(owner)
+    ).json()
+
+    read = client.post(
+        f"/api/v1/chat/conversations/{convo['id']}/read", params={"message_id": 10**9}, headers=auth(student)
+    ).json()
+    assert read["last_read_message_id"] == sent["id"]
+
+    client.post("/api/v1/chat/messages", json={"conversation_id": convo["id"], "content": "¿sigue libre?"}, headers=auth(owner))
+    inbox = client.get("/api/v1/chat/conversations", headers=auth(student)).json()["items"]
+    assert inbox[0]["unread_count"] == 1
+
+
+def test_first_message_right_after_creating_the_conversation_fills_the_inbox_summary(client, auth, make_user):
+    owner, student = make_user(UserRole.OWNER), make_user()
+    convo = client.post(
+        "/api/v1/chat/conversations/by-users",
+        params={"owner_id": owner.id, "student_id": student.id},
+        headers=auth(student),
+    ).json()
+    client.post("/api/v1/chat/messages", json={"conversation_id": convo["id"], "content": "hola"}, headers=auth(student))
+
+    inbox = client.get("/api/v1/chat/conversations", headers=auth(owner)).json()["items"]
+
+    assert [(item["id"], item["last_message"]) for item in inbox] == [(convo["id"], "hola")]
+
+
+def _open_conversation(client, auth, user, owner, student):
+    return client.post(
+        "/api/v1/chat/conversations/by-users",
+        params={"owner_id": owner.id, "student_id": student.id},
+        headers=auth(user),
+    )
+
+
+def test_get_or_create_conversation_returns_the_same_conversation(client, auth, make_user):
+    owner, student = make_user(UserRole.OWNER), make_user()
+
+    first = _open_conversation(client, auth, student, owner, student).json()
+    assert _open_conversation(client, auth, owner, owner, student).json()["id"] == first["id"]
+
+    # Peticiones simultáneas para un par nuevo: todas ven la misma fila
+    other = make_user()
+    barrier = threading.Barrier(4)
+    responses = []
+
+    def open_it():
+        barrier.wait()
+        responses.append(_open_conversation(client, auth, other, owner, other))
+
+    threads = [threading.Thread(target=open_it) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = {r.json()["id"] for r in responses if r.status_code == 200}
+    assert len(ids) == 1 and first["id"] not in ids
+    assert all(r.status_code in (200, 409) for r in responses)
+
+
+def test_get_or_create_conversation_answers_409_when_the_insert_is_ignored(client, auth, make_user, monkeypatch):
+    from app.api.v1.endpoints import chat
+
+    owner, student = make_user(UserRole.OWNER), make_user()
+    monkeypatch.setattr(chat, "_insert_conversation_if_missing", lambda *args: None)
+
+    response = _open_conversation(client, auth, student, owner, student)
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+
+
+def _send(client, auth, user, conversation_id, content):
+    return client.post(
+        "/api/v1/chat/messages", json={"conversation_id": conversation_id, "content": content}, headers=auth(user)
+    ).json()["id"]
+
+
+def _search(client, auth, user, q, **params):
+    return client.get("/api/v1/chat/search", params={"q": q, **params}, headers=auth(user)).json()
+
+
+def test_search_matches_every_term_by_prefix_in_my_conversations(client, auth, make_user):
+    owner, student, stranger = make_user(UserRole.OWNER), make_user(), make_user()
+    mine = _open_conversation(client, auth, student, owner, student).json()["id"]
+    theirs = _open_conversation(client, auth, stranger, owner, stranger).json()["id"]
+    deposit = _send(client, auth, owner, mine, "El depósito es de un mes")
+    deposit_and_rent = _send(client, auth, student, mine, "¿Pago el DEPOSITO junto con la renta?")
+    _send(client, auth, owner, mine, "La renta vence el día 5")
+    _send(client, auth, owner, theirs, "Depósito y renta para otro estudiante")
+
+    # Prefijo sin tildes ni mayúsculas, solo en mis conversaciones
+    assert [hit["id"] for hit in _search(client, auth, student, "depos")["items"]] == [deposit_and_rent, deposit]
+    # Varios términos: todos deben aparecer en el mismo mensaje
+    assert [hit["id"] for hit in _search(client, auth, student, "depó rent")["items"]] == [deposit_and_rent]
+    assert _search(client, auth, stranger, "depos")["items"][0]["conversation_id"] == theirs
+    assert len(_search(client, auth, stranger, "depos")["items"]) == 1
+
+
+def test_search_pages_results_with_cursor(client, auth, make_user):
+    owner, student = make_user(UserRole.OWNER), make_user()
+    convo = _open_conversation(client, auth, student, owner, student).json()["id"]
+    sent = [_send(client, auth, owner, convo, f"aviso número {i}") for i in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        page = _search(client, auth, student, "aviso", limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += [hit["id"] for hit in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None or len(seen) > len(sent):
+            break
+
+    assert seen == sorted(sent, reverse=True)
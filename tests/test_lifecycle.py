@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.room import Room
+from app.models.user import UserRole
+from app.services.lifecycle import complete_expired_reservations
+
+NOW = datetime(2030, 6, 1)
+
+
+def _confirmed(room, student, end):
+    return Reservation(
+        room_id=room.id,
+        student_id=student.id,
+        start_date=end - timedelta(days=90),
+        end_date=end,
+        status=ReservationStatus.CONFIRMED,
+    )
+
+
+def test_complete_expired_reservations_frees_rooms_and_is_idempotent(client, db, auth, make_user, make_room):
+    owner = make_user(UserRole.OWNER)
+    expired_room, current_room, reused_room = (make_room(owner, is_available=False) for _ in range(3))
+    students = [make_user() for _ in range(4)]
+    expired = _confirmed(expired_room, students[0], NOW - timedelta(days=1))
+    current = _confirmed(current_room, students[1], NOW + timedelta(days=30))
+    # La habitación sigue ocupada: la reserva vencida tiene una sucesora vigente
+    reused_old = _confirmed(reused_room, students[2], NOW - timedelta(days=2))
+    reused_new = _confirmed(reused_room, students[3], NOW + timedelta(days=60))
+    db.add_all([expired, current, reused_old, reused_new])
+    db.commit()
+    stats_before = client.get(f"/api/v1/dashboard/owner/{owner.id}", headers=auth(owner)).json()
+    assert (stats_before["confirmed"], stats_before["rooms_available"]) == (4, 0)
+
+    assert complete_expired_reservations(db, now=NOW, batch_size=1) == 2
+
+    statuses = dict(db.query(Reservation.id, Reservation.status))
+    assert statuses == {
+        expired.id: ReservationStatus.COMPLETED,
+        current.id: ReservationStatus.CONFIRMED,
+        reused_old.id: ReservationStatus.COMPLETED,
+        reused_new.id: ReservationStatus.CONFIRMED,
+    }
+    available = dict(db.query(Room.id, Room.is_available))
+    assert available == {expired_room.id: True, current_room.id: False, reused_room.id: False}
+    db.rollback()
+
+    stats = client.get(f"/api/v1/dashboard/owner/{owner.id}", headers=auth(owner)).json()
+    assert (stats["confirmed"], stats["completed"], stats["rooms_available"]) == (2, 2, 1)
+    assert stats["expected_monthly_revenue"] == 2 * 500.0
+
+    # Segunda pasada: nada que completar y el resumen no cambia
+    assert complete_expired_reservations(db, now=NOW) == 0
+    assert client.get(f"/api/v1/dashboard/owner/{owner.id}", headers=auth(owner)).json() == stats
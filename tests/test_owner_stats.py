@@ -0,0 +1,25 @@
+from app.models.owner_stats import OwnerStats
+from app.models.user import UserRole
+
+
+def test_dashboard_returns_404_for_unknown_or_non_owner_user(client, auth, make_user):
+    admin = make_user(UserRole.SUPERADMIN)
+    student = make_user()
+
+    assert client.get("/api/v1/dashboard/owner/9999", headers=auth(admin)).status_code == 404
+    assert client.get(f"/api/v1/dashboard/owner/{student.id}", headers=auth(admin)).status_code == 404
+
+
+def test_update_room_keeps_owner_stats_in_sync(client, db, auth, make_user, make_room):
+    owner = make_user(UserRole.OWNER)
+    room = make_room(owner, price=400.0)
+    assert client.get(f"/api/v1/dashboard/owner/{owner.id}", headers=auth(owner)).json()["rooms_available"] == 1
+
+    response = client.put(
+        f"/api/v1/rooms/{room.id}", json={"is_available": False, "price_per_month": 450.0}, headers=auth(owner)
+    )
+    assert response.status_code == 200
+
+    stats = client.get(f"/api/v1/dashboard/owner/{owner.id}", headers=auth(owner)).json()
+    assert (stats["rooms_available"], stats["rooms_occupied"], stats["expected_monthly_revenue"]) == (0, 1, 450.0)
+    assert db.get(OwnerStats, owner.id).rooms_total == 1
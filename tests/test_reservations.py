@@ -0,0 +1,251 @@
+import csv
+import io
+import json
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.user import UserRole
+from app.services import owner_stats
+
+START = datetime(2030, 3, 1)
+END = START + timedelta(days=90)
+
+
+def _reserve(client, auth, student, room, start=START, end=END):
+    return client.post(
+        "/api/v1/reservations/",
+        json={"room_id": room.id, "start_date": start.isoformat(), "end_date": end.isoformat()},
+        headers=auth(student),
+    )
+
+
+def _confirmed(db, room):
+    count = db.query(Reservation).filter(
+        Reservation.room_id == room.id, Reservation.status == ReservationStatus.CONFIRMED
+    ).count()
+    db.rollback()
+    return count
+
+
+def _run_concurrently(calls):
+    """Ejecuta las llamadas a la vez (barrera) y devuelve sus respuestas."""
+    barrier = threading.Barrier(len(calls))
+    responses = [None] * len(calls)
+
+    def worker(i, call):
+        barrier.wait()
+        responses[i] = call()
+
+    threads = [threading.Thread(target=worker, args=(i, call)) for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def test_confirm_rejects_overlapping_confirmed_reservation(client, db, auth, make_user, make_room):
+    owner = make_user(UserRole.OWNER)
+    room = make_room(owner)
+    first = _reserve(client, auth, make_user(), room).json()
+    second = _reserve(client, auth, make_user(), room, START + timedelta(days=30), END + timedelta(days=30)).json()
+
+    assert client.post(f"/api/v1/reservations/{first['id']}/confirm", headers=auth(owner)).status_code == 200
+    response = client.post(f"/api/v1/reservations/{second['id']}/confirm", headers=auth(owner))
+
+    assert response.status_code == 409
+    assert _confirmed(db, room) == 1
+
+
+def test_concurrent_confirms_book_the_room_once(client, db, auth, make_user, make_room):
+    owner = make_user(UserRole.OWNER)
+    room = make_room(owner)
+    pending = [_reserve(client, auth, make_user(), room).json()["id"] for _ in range(6)]
+
+    responses = _run_concurrently(
+        [
+            lambda reservation_id=reservation_id: client.post(
+                f"/api/v1/reservations/{reservation_id}/confirm", headers=auth(owner)
+            )
+            for reservation_id in pending
+        ]
+    )
+
+    codes = sorted(r.status_code for r in responses)
+    assert codes.count(200) == 1
+    assert set(codes) <= {200, 409}
+    assert _confirmed(db, room) == 1
+
+
+def test_concurrent_requests_of_one_student_create_one_active_reservation(client, db, auth, make_user, make_room):
+    owner = make_user(UserRole.OWNER)
+    rooms = [make_room(owner) for _ in range(5)]
+    student = make_user()
+
+    responses = _run_concurrently(
+        [lambda room=room: _reserve(client, auth, student, room) for room in rooms]
+    )
+
+    assert [r.status_code for r in responses].count(200) == 1
+    assert all(r.status_code in (400, 409) for r in responses if r.status_code != 200)
+    assert db.query(Reservation).filter(Reservation.student_id == student.id).count() == 1
+
+
+def test_lock_failure_anywhere_in_booking_returns_retryable_409(client, db, auth, make_user, make_room, monkeypatch):
+    owner = make_user(UserRole.OWNER)
+    room = make_room(owner)
+
+    def lock_wait_timeout(*args, **kwargs):
+        raise OperationalError("UPDATE owner_stats", {}, Exception("Lock wait timeout exceeded"))
+
+    # Falla en los contadores del owner, después de los locks y comprobaciones
+    monkeypatch.setattr(owner_stats, "record", lock_wait_timeout)
+    response = _reserve(client, auth, make_user(), room)
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert db.query(Reservation).count() == 0
+
+
+def test_reservations_by_owner_query_count_does_not_grow_with_rows(client, db, count_queries, make_user, make_room):
+    owner = make_user(UserRole.OWNER, full_name="Olga Owner")
+    room = make_room(owner)
+
+    with count_queries() as empty:
+        assert client.get(f"/api/v1/reservations/by_owner/{owner.id}").json() == []
+
+    students = [make_user() for _ in range(15)]
+    db.add_all(
+        Reservation(
+            room_id=room.id,
+            student_id=student.id,
+            start_date=START + timedelta(days=i),
+            end_date=END + timedelta(days=i),
+            status=ReservationStatus.PENDING,
+        )
+        for i, student in enumerate(students)
+    )
+    db.commit()
+
+    with count_queries() as filled:
+        rows = client.get(f"/api/v1/reservations/by_owner/{owner.id}").json()
+
+    assert len(rows) == len(students)
+    assert {row["owner_name"] for row in rows} == {"Olga Owner"}
+    assert {row["student_name"] for row in rows} == {s.full_name for s in students}
+    assert 0 < filled[0] == empty[0]
+
+
+def test_owner_only_lists_reservations_of_own_rooms(client, auth, make_user, make_room):
+    owner, other_owner = make_user(UserRole.OWNER), make_user(UserRole.OWNER)
+    own = _reserve(client, auth, make_user(), make_room(owner)).json()
+    _reserve(client, auth, make_user(), make_room(other_owner))
+
+    for params in ("", f"?owner_id={other_owner.id}"):
+        items = client.get(f"/api/v1/reservations/{params}", headers=auth(owner)).json()["items"]
+        assert [item["id"] for item in items] == [own["id"]]
+
+
+def _stats(client, auth, owner):
+    stats = client.get(f"/api/v1/dashboard/owner/{owner.id}", headers=auth(owner)).json()
+    return {key: stats[key] for key in ("pending", "confirmed", "rejected", "completed", "rooms_available")}
+
+
+def test_concurrent_confirm_and_reject_apply_one_transition(client, db, auth, make_user, make_room):
+    owner = make_user(UserRole.OWNER)
+    room = make_room(owner)
+    reservation_id = _reserve(client, auth, make_user(), room).json()["id"]
+
+    responses = _run_concurrently(
+        [
+            lambda action=action: client.post(f"/api/v1/reservations/{reservation_id}/{action}", headers=auth(owner))
+            for action in ("confirm", "reject")
+        ]
+    )
+
+    assert sorted(r.status_code for r in responses) == [200, 409]
+    confirmed = responses[0].status_code == 200
+    assert _stats(client, auth, owner) == {
+        "pending": 0,
+        "confirmed": 1 if confirmed else 0,
+        "rejected": 0 if confirmed else 1,
+        "completed": 0,
+        "rooms_available": 0 if confirmed else 1,
+    }
+
+
+def test_reject_only_applies_to_pending_reservations(client, auth, make_user, make_room):
+    owner = make_user(UserRole.OWNER)
+    reservation_id = _reserve(client, auth, make_user(), make_room(owner)).json()["id"]
+    assert client.post(f"/api/v1/reservations/{reservation_id}/confirm", headers=auth(owner)).status_code == 200
+
+    response = client.post(f"/api/v1/reservations/{reservation_id}/reject", headers=auth(owner))
+
+    assert response.status_code == 409
+    assert _stats(client, auth, owner)["confirmed"] == 1
+
+
+def _batch(client, auth, user, action, reservation_ids):
+    return client.post(
+        "/api/v1/reservations/batch",
+        json={"action": action, "reservation_ids": reservation_ids},
+        headers=auth(user),
+    )
+
+
+def test_batch_confirm_and_reject_apply_per_item_rules_and_keep_owner_stats(client, db, auth, make_user, make_room):
+    owner, other_owner = make_user(UserRole.OWNER), make_user(UserRole.OWNER)
+    rooms = [make_room(owner) for _ in range(3)]
+    to_confirm = [_reserve(client, auth, make_user(), room).json()["id"] for room in rooms[:2]]
+    to_reject = _reserve(client, auth, make_user(), rooms[2]).json()["id"]
+    foreign = _reserve(client, auth, make_user(), make_room(other_owner)).json()["id"]
+
+    confirmed = _batch(client, auth, owner, "confirm", to_confirm + [foreign, 9999]).json()
+    assert (confirmed["confirmed"], confirmed["rejected"], confirmed["failed"]) == (2, 0, 2)
+    assert {r["id"]: r["detail"] for r in confirmed["results"] if not r["ok"]} == {
+        foreign: "No autorizado",
+        9999: "Reserva no encontrada",
+    }
+
+    # Una reserva ya confirmada no se puede rechazar en el lote; la pendiente sí
+    rejected = _batch(client, auth, owner, "reject", [to_reject, to_confirm[0]]).json()
+    assert (rejected["confirmed"], rejected["rejected"], rejected["failed"]) == (0, 1, 1)
+    assert {r["id"]: (r["ok"], r["detail"]) for r in rejected["results"]} == {
+        to_reject: (True, None),
+        to_confirm[0]: (False, "La reserva ya no está pendiente"),
+    }
+
+    assert _stats(client, auth, owner) == {
+        "pending": 0,
+        "confirmed": 2,
+        "rejected": 1,
+        "completed": 0,
+        "rooms_available": 1,
+    }
+    assert _stats(client, auth, other_owner)["pending"] == 1
+    assert _confirmed(db, rooms[0]) == _confirmed(db, rooms[1]) == 1
+
+
+def test_export_streams_only_the_callers_reservations(client, auth, make_user, make_room):
+    owner, other_owner = make_user(UserRole.OWNER), make_user(UserRole.OWNER)
+    own = [_reserve(client, auth, make_user(), make_room(owner)).json()["id"] for _ in range(3)]
+    _reserve(client, auth, make_user(), make_room(other_owner))
+
+    response = client.get("/api/v1/reservations/export", params={"owner_id": other_owner.id}, headers=auth(owner))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == [
+        "id", "room_id", "residence_id", "owner_id", "student_id",
+        "start_date", "end_date", "status", "total_price",
+    ]
+    assert [int(row[0]) for row in rows[1:]] == own
+    assert {row[3] for row in rows[1:]} == {str(owner.id)}
+    assert {row[7] for row in rows[1:]} == {ReservationStatus.PENDING.value}
+
+    ndjson = client.get("/api/v1/reservations/export", params={"format": "ndjson"}, headers=auth(owner))
+    assert [json.loads(line)["id"] for line in ndjson.text.splitlines()] == own
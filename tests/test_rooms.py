@@ -0,0 +1,17 @@
+from app.api.v1.endpoints import rooms
+from app.models.user import UserRole
+
+
+def test_facets_reject_price_steps_that_explode_the_histogram(client, make_user, make_room, monkeypatch):
+    owner = make_user(UserRole.OWNER)
+    for price in (150.0, 250.0, 350.0):
+        make_room(owner, price=price)
+    monkeypatch.setattr(rooms, "MAX_PRICE_BUCKETS", 2)
+
+    assert client.get("/api/v1/rooms/public/facets", params={"price_step": 0}).status_code == 422
+    assert client.get("/api/v1/rooms/public/facets", params={"price_step": 0.01}).status_code == 422
+    assert client.get("/api/v1/rooms/public/facets", params={"price_step": 100}).status_code == 422
+
+    response = client.get("/api/v1/rooms/public/facets", params={"price_step": 200})
+    assert response.status_code == 200
+    assert [(b["min_price"], b["count"]) for b in response.json()["price_histogram"]] == [(0.0, 1), (200.0, 2)]